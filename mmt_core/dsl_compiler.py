@@ -1,12 +1,34 @@
 from __future__ import annotations
 
 import re
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple, Sequence, Literal
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Sequence, Literal
 
 SegmentType = Literal["text", "expr", "image"]
 
+_CUSTOM_ID_RE = re.compile(r"^[\w][\w\-]*$")
+# Standard student char ids: `kivo-<student_id>` (use with .fullmatch).
+_KIVO_ID_RE = re.compile(r"kivo-(\d+)")
+# Characters that can start an inline marker or an escape; everything between them is plain text.
+_INLINE_SPECIAL_RE = re.compile(r"[\\(\[]")
+# Payload forms for generic `Directive` nodes (the line parser normally emits typed nodes instead).
+_DIRECTIVE_PAYLOAD_RE = {
+    name: re.compile(rf"^@{name}\s+(.+)$", re.IGNORECASE)
+    for name in ("alias", "tmpalias", "aliasid", "unaliasid", "charid", "uncharid", "avatarid", "unavatarid", "avatar")
+}
+# Query suffixes for `[图片]` placeholders: "<display> 的反应图/表情图[。上下文：<ctx>]".
+_REACTION_QUERY = " 的反应图/表情图"
+_REACTION_QUERY_CTX = " 的反应图/表情图。上下文："
+# Expression backref targets: `_` (previous speaker) or `_<n>`; use with .fullmatch on a stripped target.
+_BACKREF_TARGET_RE = re.compile(r"_(\d*)")
+# Deepest supported expression backref (`[q](_n)`); only this many past speakers are kept around.
+_MAX_BACKREF = 1024
+# Shared `yuzutalk` payloads for the common no-override cases; the compiler never mutates them.
+_NARRATION_YUZUTALK: Dict[str, str] = {"type": "NARRATION", "avatarState": "AUTO", "nameOverride": ""}
+_TEXT_YUZUTALK: Dict[str, str] = {"type": "TEXT", "avatarState": "AUTO", "nameOverride": ""}
+
 
 @dataclass(frozen=True)
 class InlineSegment:
@@ -42,6 +64,13 @@ def parse_inline_segments(
     n = len(content)
     while i < n:
         ch = content[i]
+        if ch != "\\" and ch != "(" and ch != "[":
+            # Copy the whole plain-text run up to the next special character in one slice.
+            m = _INLINE_SPECIAL_RE.search(content, i)
+            j = m.start() if m else n
+            buf.append(content[i:j])
+            i = j
+            continue
         if ch == "\\" and i + 1 < n:
             if preserve_backslash:
                 buf.append("\\")
@@ -169,17 +198,12 @@ def parse_inline_segments(
 
 
 def is_backref_target(target: str) -> bool:
-    t = target.strip()
-    return t == "_" or (t.startswith("_") and t[1:].isdigit())
+    return _BACKREF_TARGET_RE.fullmatch(target.strip()) is not None
 
 
 def parse_backref_n(target: str) -> Optional[int]:
-    t = target.strip()
-    if t == "_":
-        return 1
-    if t.startswith("_") and t[1:].isdigit():
-        return int(t[1:])
-    return None
+    m = _BACKREF_TARGET_RE.fullmatch(target.strip())
+    return int(m.group(1) or 1) if m is not None else None
 
 
 @dataclass(frozen=True)
@@ -232,6 +256,8 @@ class MMTCompiler:
         messages: List[Dict[str, Any]] = field(default_factory=list)
         last_kind: Optional[str] = None
         last_display_name: Optional[str] = None
+        # Continuation lines buffered per message index; joined once after the node pass.
+        content_parts: Dict[int, List[str]] = field(default_factory=dict)
         # Nodes we don't understand yet (kept for debugging)
         body: List[Any] = field(default_factory=list)
 
@@ -254,6 +280,9 @@ class MMTCompiler:
         self._options: CompileOptions = CompileOptions()
         self._base_index: Dict[str, List[int]] = {}
         self._id_to_name: Dict[int, str] = {}
+        # Memoized `_resolve_student_id` results; only valid for the current name_to_id/base_index.
+        self._student_id_cache: Dict[str, Optional[int]] = {}
+        self._hash_id_cache: Dict[str, str] = {}
 
         self._pack_v2_ba: Any = None
         self._pack_v2_base_root: Optional[Path] = None
@@ -276,6 +305,8 @@ class MMTCompiler:
         self._active_tmpalias: Dict[str, Optional[Tuple[str, str]]] = {">": None, "<": None}
 
         self._char_id_to_display_name: Dict[str, str] = {}
+        # One canonical string per char_id, so messages share it instead of holding per-line copies.
+        self._char_id_pool: Dict[str, str] = {}
 
     def parse_nodes(self, text: str) -> List[Any]:
         from mmt_core.dsl_parser import MMTLineParser
@@ -301,6 +332,7 @@ class MMTCompiler:
         from mmt_core.mmt_text_to_json import _build_base_index, _load_name_to_id  # noqa: F401
 
         self._base_index = _build_base_index(self._name_to_id)
+        self._student_id_cache = {}
         self._id_to_name = {}
         for name, sid in self._name_to_id.items():
             if sid not in self._id_to_name:
@@ -326,6 +358,7 @@ class MMTCompiler:
         st = self._State()
         for node in nodes:
             self._handle_node(st, node)
+        self._flush_continuations(st)
 
         # Post-process: segments
         self._attach_segments(st)
@@ -441,8 +474,17 @@ class MMTCompiler:
                 loc = f"line {line_no}:{col}" if col else f"line {line_no}"
                 raise ValueError(f"{loc}: continuation line before any statement")
             raise ValueError("continuation line before any statement")
+        idx = len(st.messages) - 1
+        parts = st.content_parts.get(idx)
+        if parts is None:
+            parts = st.content_parts[idx] = [str(st.messages[idx].get("content", ""))]
+        parts.append(text)
+
+    def _flush_continuations(self, st: _State) -> None:
         sep = "\n" if bool(self._options.join_with_newline) else " "
-        st.messages[-1]["content"] = f"{st.messages[-1].get('content','')}{sep}{text}"
+        for idx, parts in st.content_parts.items():
+            st.messages[idx]["content"] = sep.join(parts)
+        st.content_parts.clear()
 
     @staticmethod
     def _node_line_no(node: Any) -> int:
@@ -487,7 +529,7 @@ class MMTCompiler:
 
         if kind == "-":
             msg: Dict[str, Any] = {
-                "yuzutalk": {"type": "NARRATION", "avatarState": "AUTO", "nameOverride": ""},
+                "yuzutalk": _NARRATION_YUZUTALK,
                 "content": content,
                 "line_no": line_no,
             }
@@ -513,7 +555,9 @@ class MMTCompiler:
 
             if isinstance(marker, MarkerExplicit):
                 raw_name = str(marker.selector)
-                canonical = self._alias_id_to_name.get(raw_name, raw_name)
+                # Most scripts never use @aliasid; skip the lookup while no alias id is registered.
+                alias_ids = self._alias_id_to_name
+                canonical = alias_ids.get(raw_name, raw_name) if alias_ids else raw_name
                 char_id_resolved, disp_guess = self._resolve_char_id_from_selector(
                     canonical,
                     line_no=line_no,
@@ -534,7 +578,7 @@ class MMTCompiler:
         if speaker is None:
             char_id = "__Sensei"
         else:
-            char_id = speaker
+            char_id = self._char_id_pool.setdefault(speaker, speaker)
 
         # tmpalias lifecycle: speaker change clears the active tmpalias for this side.
         active = self._active_tmpalias[kind]
@@ -555,7 +599,9 @@ class MMTCompiler:
             name_override = self._alias_char_id_to_override[char_id]
 
         msg2: Dict[str, Any] = {
-            "yuzutalk": {"type": "TEXT", "avatarState": "AUTO", "nameOverride": name_override or ""},
+            "yuzutalk": (
+                {"type": "TEXT", "avatarState": "AUTO", "nameOverride": name_override} if name_override else _TEXT_YUZUTALK
+            ),
             "side": side,
             "content": content,
             "line_no": line_no,
@@ -577,11 +623,8 @@ class MMTCompiler:
         elif char_id.startswith("ba."):
             display_name = self._base_name(char_id.split(".", 1)[1])
         elif char_id.startswith("kivo-"):
-            sid_txt = char_id.split("-", 1)[1]
-            if sid_txt.isdigit():
-                display_name = self._id_to_name.get(int(sid_txt), char_id)
-            else:
-                display_name = char_id
+            m = _KIVO_ID_RE.fullmatch(char_id)
+            display_name = self._id_to_name.get(int(m.group(1)), char_id) if m else char_id
         else:
             display_name = self._char_id_to_display_name.get(char_id, char_id)
         st.last_display_name = display_name or st.last_display_name
@@ -605,13 +648,13 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @alias directive (empty name)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@alias\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["alias"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @alias directive")
             rest = m.group(1).strip()
-            if "=" not in rest:
+            base_name, sep, override = rest.partition("=")
+            if not sep:
                 raise ValueError(f"{loc}: invalid @alias directive (missing '=')")
-            base_name, override = rest.split("=", 1)
             base_name = base_name.strip()
             override = override.strip()
             if not base_name:
@@ -640,13 +683,13 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @tmpalias directive (empty name)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@tmpalias\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["tmpalias"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @tmpalias directive")
             rest = m.group(1).strip()
-            if "=" not in rest:
+            base_name, sep, override = rest.partition("=")
+            if not sep:
                 raise ValueError(f"{loc}: invalid @tmpalias directive (missing '=')")
-            base_name, override = rest.split("=", 1)
             base_name = base_name.strip()
             override = override.strip()
             if not base_name:
@@ -678,7 +721,7 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @aliasid directive")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@aliasid\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["aliasid"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @aliasid directive")
             rest = m.group(1).strip()
@@ -699,7 +742,7 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @unaliasid directive (empty id)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@unaliasid\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["unaliasid"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @unaliasid directive")
             alias_id = m.group(1).strip()
@@ -718,7 +761,7 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @charid directive")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@charid\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["charid"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @charid directive")
             rest = m.group(1).strip()
@@ -728,7 +771,7 @@ class MMTCompiler:
             cid, display = parts[0].strip(), parts[1].strip()
             if not cid or not display:
                 raise ValueError(f"{loc}: invalid @charid directive")
-        if not re.match(r"^[\w][\w\-]*$", cid):
+        if not _CUSTOM_ID_RE.match(cid):
             raise ValueError(f"{loc}: invalid @charid id: {cid}")
         self._custom_id_to_display[cid] = display
 
@@ -741,7 +784,7 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @uncharid directive (empty id)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@uncharid\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["uncharid"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @uncharid directive")
             cid = m.group(1).strip()
@@ -763,7 +806,7 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @avatarid directive (empty asset name)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@avatarid\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["avatarid"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @avatarid directive")
             rest = m.group(1).strip()
@@ -798,7 +841,7 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @unavatarid directive (empty id)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@unavatarid\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["unavatarid"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @unavatarid directive")
             cid = m.group(1).strip()
@@ -819,13 +862,13 @@ class MMTCompiler:
                 raise ValueError(f"{loc}: invalid @avatar directive (empty character name)")
         else:
             payload = str(getattr(node, "payload") or "").strip()
-            m = re.match(r"^@avatar\s+(.+)$", payload, flags=re.IGNORECASE)
+            m = _DIRECTIVE_PAYLOAD_RE["avatar"].match(payload)
             if not m:
                 raise ValueError(f"{loc}: invalid @avatar directive")
             rest = m.group(1).strip()
-            if "=" not in rest:
+            base_name, sep, asset_name = rest.partition("=")
+            if not sep:
                 raise ValueError(f"{loc}: invalid @avatar directive (missing '=')")
-            base_name, asset_name = rest.split("=", 1)
             base_name = base_name.strip()
             asset_name = asset_name.strip()
             if not base_name:
@@ -872,8 +915,9 @@ class MMTCompiler:
 
         if s == "__Sensei":
             return "__Sensei", "Sensei"
-        if s.startswith("kivo-") and s.split("-", 1)[1].isdigit():
-            sid = int(s.split("-", 1)[1])
+        m = _KIVO_ID_RE.fullmatch(s)
+        if m:
+            sid = int(m.group(1))
             return f"kivo-{sid}", str(sid)
         if s.startswith("custom-") and len(s) > len("custom-"):
             return s, s.split("-", 1)[1]
@@ -894,7 +938,7 @@ class MMTCompiler:
                     raise ValueError(f"{loc}: unknown ba character: {name}")
                 return f"kivo-{sid}", name
             if ns_l == "custom":
-                if re.match(r"^[\w][\w\-]*$", name):
+                if _CUSTOM_ID_RE.match(name):
                     disp = self._custom_id_to_display.get(name, name)
                     return f"custom-{name}", disp
                 return f"custom-{self._hash_id(name)}", name
@@ -928,13 +972,25 @@ class MMTCompiler:
         return name
 
     def _hash_id(self, text: str) -> str:
-        import hashlib
+        # Keep sha1 so custom-<hash> ids stay stable across versions; just avoid rehashing repeat speakers.
+        text = text or ""
+        hid = self._hash_id_cache.get(text)
+        if hid is None:
+            import hashlib
 
-        h = hashlib.sha1()
-        h.update((text or "").encode("utf-8"))
-        return h.hexdigest()[:10]
+            hid = self._hash_id_cache[text] = hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+        return hid
 
     def _resolve_student_id(self, name: str) -> Optional[int]:
+        try:
+            return self._student_id_cache[name]
+        except KeyError:
+            pass
+        sid = self._resolve_student_id_uncached(name)
+        self._student_id_cache[name] = sid
+        return sid
+
+    def _resolve_student_id_uncached(self, name: str) -> Optional[int]:
         n = (name or "").strip()
         if not n:
             return None
@@ -968,17 +1024,19 @@ class MMTCompiler:
             cid, _disp = self._resolve_char_id_from_selector(s, line_no=-1, allow_custom_fallback=False)
         except Exception:
             return None
-        if not cid.startswith("kivo-"):
+        m = _KIVO_ID_RE.fullmatch(cid)
+        if not m:
             return None
-        sid = int(cid.split("-", 1)[1])
-        return f"avatar/{sid}.png"
+        return f"avatar/{int(m.group(1))}.png"
 
     def _attach_segments(self, st: _State) -> None:
         # mirror legacy segment parsing for expr/text
         typst_mode = bool(self._options.typst_mode)
 
         global_current_char_id: Optional[str] = None
-        global_history: List[str] = []
+        global_history: Deque[str] = deque(maxlen=_MAX_BACKREF + 1)
+        # `[图片]` display names per char id; display names are final once the node pass is done.
+        placeholder_display: Dict[str, str] = {}
 
         from mmt_core.mmt_text_to_json import _is_url_like, _parse_asset_query  # reuse behavior
 
@@ -987,7 +1045,11 @@ class MMTCompiler:
             return ""
 
         def build_segments_for_text(content_clean: str, *, line_no: int) -> List[Dict[str, Any]]:
+            # Fast path: without '[' there is no expression marker, and without a backslash no escape to unfold.
+            if "[" not in content_clean and "\\" not in content_clean:
+                return [{"type": "text", "text": content_clean}]
             segments_out: List[Dict[str, Any]] = []
+            _append = segments_out.append
             for seg in parse_inline_segments(
                 content_clean,
                 require_colon_prefix=bool(typst_mode),
@@ -995,7 +1057,7 @@ class MMTCompiler:
             ):
                 if seg.type == "text":
                     if seg.text:
-                        segments_out.append({"type": "text", "text": seg.text})
+                        _append({"type": "text", "text": seg.text})
                     continue
                 if seg.type != "expr":
                     continue
@@ -1005,21 +1067,21 @@ class MMTCompiler:
                     query = query[1:].lstrip()
                 target = (seg.target or "").strip()
                 if not query:
-                    segments_out.append({"type": "text", "text": "[]"})
+                    _append({"type": "text", "text": "[]"})
                     continue
 
                 if _is_url_like(query) and target == "":
-                    segments_out.append({"type": "image", "ref": query, "alt": query})
+                    _append({"type": "image", "ref": query, "alt": query})
                     continue
 
                 if target == "":
                     asset_name = _parse_asset_query(query)
                     if asset_name:
-                        segments_out.append({"type": "asset", "name": asset_name, "text": f"[asset:{asset_name}]"})
+                        _append({"type": "asset", "name": asset_name, "text": f"[asset:{asset_name}]"})
                         continue
 
                 if target == "" and query.lstrip().startswith("{") and query.rstrip().endswith("}"):
-                    segments_out.append({"type": "text", "text": f"[{query}]"})
+                    _append({"type": "text", "text": f"[{query}]"})
                     continue
 
                 is_image_placeholder = target == "" and query == "图片"
@@ -1035,21 +1097,24 @@ class MMTCompiler:
                         global_current_char_id.startswith("kivo-")
                         or (global_current_char_id.startswith("ba.") and self._pack_v2_ba is not None)
                     ):
-                        segments_out.append({"type": "text", "text": f"[{query}]"})
+                        _append({"type": "text", "text": f"[{query}]"})
                         continue
                     resolved_char_id = global_current_char_id
-                elif is_backref_target(target):
-                    n = parse_backref_n(target)
-                    if n is None or n <= 0:
+                elif (m_back := _BACKREF_TARGET_RE.fullmatch(target)) is not None:
+                    n = int(m_back.group(1) or 1)
+                    if n <= 0:
                         raise ValueError(f"line {line_no}: invalid backref target: {target}")
+                    if n > _MAX_BACKREF:
+                        raise ValueError(f"line {line_no}: backref target too deep (max _{_MAX_BACKREF}): {target}")
                     idx2 = -(n + 1)
                     if len(global_history) < (n + 1):
                         raise ValueError(f"line {line_no}: not enough global speaker history for {target}")
                     resolved_char_id = global_history[idx2]
                 else:
                     tsel = target.strip()
-                    if tsel.startswith("kivo-") and tsel.split("-", 1)[1].isdigit():
-                        resolved_char_id = f"kivo-{int(tsel.split('-', 1)[1])}"
+                    m_kivo = _KIVO_ID_RE.fullmatch(tsel)
+                    if m_kivo:
+                        resolved_char_id = f"kivo-{int(m_kivo.group(1))}"
                     else:
                         ns, rest = self._split_namespace(tsel)
                         if ns is not None:
@@ -1081,29 +1146,28 @@ class MMTCompiler:
                 if resolved_char_id == "__Sensei":
                     raise ValueError(f"line {line_no}: expression target cannot be Sensei")
 
-                student_id: Optional[int] = None
-                if resolved_char_id.startswith("kivo-"):
-                    student_id = int(resolved_char_id.split("-", 1)[1])
+                m_kivo = _KIVO_ID_RE.fullmatch(resolved_char_id)
+                student_id: Optional[int] = int(m_kivo.group(1)) if m_kivo else None
 
                 final_query = query
                 if is_image_placeholder:
-                    display_default = resolved_char_id.split(".", 1)[1] if resolved_char_id.startswith("ba.") else str(student_id or "")
-                    display = self._base_name(self._char_id_to_display_name.get(resolved_char_id, display_default))
+                    display = placeholder_display.get(resolved_char_id)
+                    if display is None:
+                        display_default = resolved_char_id.split(".", 1)[1] if resolved_char_id.startswith("ba.") else str(student_id or "")
+                        display = self._base_name(self._char_id_to_display_name.get(resolved_char_id, display_default))
+                        placeholder_display[resolved_char_id] = display
                     ctx = context_text(idx)
-                    if ctx:
-                        final_query = f"{display} 的反应图/表情图。上下文：{ctx}"
-                    else:
-                        final_query = f"{display} 的反应图/表情图"
+                    final_query = display + (_REACTION_QUERY_CTX + ctx if ctx else _REACTION_QUERY)
 
                 payload2: Dict[str, Any] = {
                     "type": "expr",
                     "text": f"[{query}]",
                     "query": final_query,
-                    "target_char_id": resolved_char_id,
+                    "target_char_id": self._char_id_pool.setdefault(resolved_char_id, resolved_char_id),
                 }
                 if student_id is not None:
                     payload2["student_id"] = student_id
-                segments_out.append(payload2)
+                _append(payload2)
             return segments_out if segments_out else [{"type": "text", "text": content_clean}]
 
         for idx, msg in enumerate(st.messages):
@@ -1141,38 +1205,47 @@ class MMTCompiler:
             content_clean = str(msg.get("content") or "")
             msg["segments"] = build_segments_for_text(content_clean, line_no=line_no)
 
+    def _pack_v2_ba_rel_root(self) -> Optional[Path]:
+        """ba pack root relative to the pack-v2 base root (or cwd); None if it cannot be resolved."""
+        try:
+            pack_root = Path(self._pack_v2_ba.root).resolve()
+            base_root: Optional[Path] = None
+            if self._pack_v2_base_root is not None:
+                try:
+                    base_root = Path(self._pack_v2_base_root).resolve()
+                    pack_root.relative_to(base_root)
+                except Exception:
+                    base_root = None
+            if base_root is None:
+                try:
+                    base_root = Path.cwd().resolve()
+                    pack_root.relative_to(base_root)
+                except Exception:
+                    base_root = pack_root
+            return pack_root.relative_to(base_root) if base_root else pack_root
+        except Exception:
+            return None
+
     def _build_custom_chars(self, st: _State) -> List[List[Any]]:
         custom_chars: List[List[Any]] = []
-        seen: set[str] = set()
-        for msg in st.messages:
-            char_id = msg.get("char_id")
-            if not char_id or char_id == "__Sensei":
-                continue
-            if char_id in seen:
-                continue
-            seen.add(char_id)
+        # First-appearance order of every non-Sensei speaker.
+        char_ids = list(
+            dict.fromkeys(cid for cid in (msg.get("char_id") for msg in st.messages) if cid and cid != "__Sensei")
+        )
+
+        # The pack root's web-relative prefix is the same for every ba.* avatar; resolve it once.
+        ba_rel_pack: Optional[Path] = None
+        if self._pack_v2_ba is not None and any(isinstance(c, str) and c.startswith("ba.") for c in char_ids):
+            ba_rel_pack = self._pack_v2_ba_rel_root()
 
+        for char_id in char_ids:
             if isinstance(char_id, str) and char_id.startswith("ba.") and self._pack_v2_ba is not None:
                 cid = char_id.split(".", 1)[1]
                 avatar_ref = "uploaded"
                 try:
-                    pack_root = Path(self._pack_v2_ba.root).resolve()
                     avatar_rel = self._pack_v2_ba.id_to_assets[cid].avatar
-                    base_root: Optional[Path] = None
-                    if self._pack_v2_base_root is not None:
-                        try:
-                            base_root = Path(self._pack_v2_base_root).resolve()
-                            pack_root.relative_to(base_root)
-                        except Exception:
-                            base_root = None
-                    if base_root is None:
-                        try:
-                            base_root = Path.cwd().resolve()
-                            pack_root.relative_to(base_root)
-                        except Exception:
-                            base_root = pack_root
-                    rel_pack = pack_root.relative_to(base_root) if base_root else pack_root
-                    avatar_ref = "/" + (rel_pack / avatar_rel).as_posix().lstrip("/")
+                    if ba_rel_pack is not None:
+                        avatar_ref = "/" + (ba_rel_pack / avatar_rel).as_posix().lstrip("/")
                 except Exception:
                     avatar_ref = "uploaded"
                 display_name = self._base_name(self._char_id_to_display_name.get(char_id, cid))
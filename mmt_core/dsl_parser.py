@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 import re
 from dataclasses import asdict, dataclass
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 
 def _strip_bom(text: str) -> str:
@@ -22,6 +22,26 @@ HEADER_DIRECTIVE_RE = re.compile(r"^@([A-Za-z_][\w.-]*)\s*:\s*(.*)$")
 SPEAKER_BACKREF_RE = re.compile(r"^_(\d*)\s*:\s*(.*)$")
 SPEAKER_INDEX_RE = re.compile(r"^~(\d*)\s*:\s*(.*)$")
 
+_TRIPLE_QUOTE_RE = re.compile(r'^("{3,})(.*)$')
+_STATEMENT_RE = re.compile(r"^(\s*)([\-<>])(\s+)(.*)$")
+_REPLY_RE = re.compile(r"^@reply\b", re.IGNORECASE)
+_REPLY_INLINE_RE = re.compile(r"^@reply\s*:\s*(.*)$", re.IGNORECASE)
+_END_RE = re.compile(r"^@end\b", re.IGNORECASE)
+_BOND_RE = re.compile(r"^@bond\b", re.IGNORECASE)
+_BOND_LINE_RE = re.compile(r"^@bond(?:\s*:\s*(.*))?$", re.IGNORECASE)
+_USEPACK_RE = re.compile(r"^@usepack\b", re.IGNORECASE)
+_USEPACK_LINE_RE = re.compile(r"^@usepack\s+(.+)$", re.IGNORECASE)
+_USEPACK_ARGS_RE = re.compile(r"^([A-Za-z0-9_]+)\s+as\s+([A-Za-z0-9_]+)$", re.IGNORECASE)
+_ALIAS_LINE_RE = re.compile(r"^@alias\s+(.+)$", re.IGNORECASE)
+_TMPALIAS_LINE_RE = re.compile(r"^@tmpalias\s+(.+)$", re.IGNORECASE)
+_ALIASID_LINE_RE = re.compile(r"^@aliasid\s+(.+)$", re.IGNORECASE)
+_UNALIASID_LINE_RE = re.compile(r"^@unaliasid\s+(.+)$", re.IGNORECASE)
+_CHARID_LINE_RE = re.compile(r"^@charid\s+(.+)$", re.IGNORECASE)
+_UNCHARID_LINE_RE = re.compile(r"^@uncharid\s+(.+)$", re.IGNORECASE)
+_AVATARID_LINE_RE = re.compile(r"^@avatarid\s+(.+)$", re.IGNORECASE)
+_UNAVATARID_LINE_RE = re.compile(r"^@unavatarid\s+(.+)$", re.IGNORECASE)
+_AVATAR_LINE_RE = re.compile(r"^@avatar\s+(.+)$", re.IGNORECASE)
+
 
 def _first_non_space_col(raw: str) -> int:
     for idx, ch in enumerate(raw):
@@ -195,7 +215,7 @@ def _parse_triple_quote_block(
     start_line_no: int,
 ) -> Optional[Tuple[str, int, int, int]]:
     lstripped = head.lstrip()
-    m = re.match(r'^("{3,})(.*)$', lstripped)
+    m = _TRIPLE_QUOTE_RE.match(lstripped)
     if not m:
         return None
     delim = m.group(1)
@@ -205,14 +225,16 @@ def _parse_triple_quote_block(
     if after != "":
         block_lines.append(after)
 
+    # Only look for the closing delimiter here; the body is sliced out in one go once it is found.
     j = start_index + 1
-    while j < len(all_lines):
+    n_lines = len(all_lines)
+    while j < n_lines:
         raw_line = all_lines[j]
-        if raw_line.strip() == delim:
+        if delim in raw_line and raw_line.strip() == delim:
+            block_lines.extend(all_lines[start_index + 1 : j])
             end_line = j + 1
             end_col = _line_end_col(raw_line)
             return "\n".join(block_lines), j + 1, end_line, end_col
-        block_lines.append(raw_line)
         j += 1
     raise ValueError(
         f"line {start_line_no}: unterminated quote block (missing {delim!r} line)"
@@ -227,7 +249,7 @@ def _parse_header_block(
     start_line_no: int,
 ) -> Tuple[str, int, int, int]:
     lstripped = first_line_value.lstrip()
-    m = re.match(r'^("{3,})(.*)$', lstripped)
+    m = _TRIPLE_QUOTE_RE.match(lstripped)
     if not m:
         raw_line = all_lines[start_index]
         end_line = start_index + 1
@@ -240,14 +262,16 @@ def _parse_header_block(
     if after != "":
         block_lines.append(after)
 
+    # Only look for the closing delimiter here; the body is sliced out in one go once it is found.
     j = start_index + 1
-    while j < len(all_lines):
+    n_lines = len(all_lines)
+    while j < n_lines:
         raw_line = all_lines[j]
-        if raw_line.strip() == delim:
+        if delim in raw_line and raw_line.strip() == delim:
+            block_lines.extend(all_lines[start_index + 1 : j])
             end_line = j + 1
             end_col = _line_end_col(raw_line)
             return "\n".join(block_lines), j + 1, end_line, end_col
-        block_lines.append(raw_line)
         j += 1
     raise ValueError(
         f"line {start_line_no}: unterminated header quote block (missing {delim!r} line)"
@@ -267,6 +291,14 @@ def _parse_payload(payload: str, *, line_no: int, col_base: int) -> Tuple[Marker
     payload = (payload or "").rstrip()
 
     def split_top_level_colon(s: str) -> Optional[Tuple[str, str]]:
+        c = s.find(":")
+        if c < 0:
+            return None
+        # Fast path: nothing before the first ':' can open a bracket or escape it, so it is top-level.
+        prefix = s[:c]
+        if "[" not in prefix and "(" not in prefix and "\\" not in prefix:
+            return prefix, s[c + 1 :]
+
         depth_sq = 0
         depth_par = 0
         escaped = False
@@ -309,17 +341,15 @@ def _parse_payload(payload: str, *, line_no: int, col_base: int) -> Tuple[Marker
             end_col=marker_end_col,
         )
 
-        m = SPEAKER_BACKREF_RE.match(head + ":" + tail)  # allow "_:" without extra spaces
-        if m:
-            n_txt, content = m.group(1), m.group(2)
-            n = int(n_txt) if n_txt else 1
-            return MarkerBackref(n=n, span=marker_span), content
-
-        m = SPEAKER_INDEX_RE.match(head + ":" + tail)  # allow "~:" without extra spaces
-        if m:
-            n_txt, content = m.group(1), m.group(2)
-            n = int(n_txt) if n_txt else 1
-            return MarkerIndex(n=n, span=marker_span), content
+        # `_`, `_N`, `~`, `~N` (same forms as SPEAKER_BACKREF_RE / SPEAKER_INDEX_RE), checked without a regex.
+        sigil = head[:1]
+        if sigil == "_" or sigil == "~":
+            n_txt = head[1:]
+            if not n_txt or n_txt.isdecimal():
+                n = int(n_txt) if n_txt else 1
+                if sigil == "_":
+                    return MarkerBackref(n=n, span=marker_span), tail
+                return MarkerIndex(n=n, span=marker_span), tail
 
         if head:
             return MarkerExplicit(selector=head, span=marker_span), tail
@@ -328,15 +358,15 @@ def _parse_payload(payload: str, *, line_no: int, col_base: int) -> Tuple[Marker
 
 
 def _is_usepack_line(line: str) -> bool:
-    return bool(re.match(r"^@usepack\b", line.strip(), flags=re.IGNORECASE))
+    return bool(_USEPACK_RE.match(line.strip()))
 
 
 def _parse_usepack_line(line: str, *, line_no: int, span: Span) -> UsePack:
-    m = re.match(r"^@usepack\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _USEPACK_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @usepack directive")
     rest = m.group(1).strip()
-    m2 = re.match(r"^([A-Za-z0-9_]+)\s+as\s+([A-Za-z0-9_]+)$", rest, flags=re.IGNORECASE)
+    m2 = _USEPACK_ARGS_RE.match(rest)
     if not m2:
         raise ValueError(
             f"{_loc(line_no, span.start_col)}: invalid @usepack directive (expected: @usepack <pack_id> as <alias>)"
@@ -345,13 +375,13 @@ def _parse_usepack_line(line: str, *, line_no: int, span: Span) -> UsePack:
 
 
 def _parse_alias_line(line: str, *, line_no: int, span: Span) -> Alias:
-    m = re.match(r"^@alias\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _ALIAS_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @alias directive")
     rest = m.group(1).strip()
-    if "=" not in rest:
+    base_name, sep, override = rest.partition("=")
+    if not sep:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @alias directive (missing '=')")
-    base_name, override = rest.split("=", 1)
     base_name = base_name.strip()
     override = override.strip()
     if not base_name:
@@ -360,13 +390,13 @@ def _parse_alias_line(line: str, *, line_no: int, span: Span) -> Alias:
 
 
 def _parse_tmpalias_line(line: str, *, line_no: int, span: Span) -> TmpAlias:
-    m = re.match(r"^@tmpalias\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _TMPALIAS_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @tmpalias directive")
     rest = m.group(1).strip()
-    if "=" not in rest:
+    base_name, sep, override = rest.partition("=")
+    if not sep:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @tmpalias directive (missing '=')")
-    base_name, override = rest.split("=", 1)
     base_name = base_name.strip()
     override = override.strip()
     if not base_name:
@@ -375,7 +405,7 @@ def _parse_tmpalias_line(line: str, *, line_no: int, span: Span) -> TmpAlias:
 
 
 def _parse_aliasid_line(line: str, *, line_no: int, span: Span) -> AliasId:
-    m = re.match(r"^@aliasid\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _ALIASID_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @aliasid directive")
     rest = m.group(1).strip()
@@ -389,7 +419,7 @@ def _parse_aliasid_line(line: str, *, line_no: int, span: Span) -> AliasId:
 
 
 def _parse_unaliasid_line(line: str, *, line_no: int, span: Span) -> UnaliasId:
-    m = re.match(r"^@unaliasid\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _UNALIASID_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @unaliasid directive")
     alias_id = m.group(1).strip()
@@ -399,7 +429,7 @@ def _parse_unaliasid_line(line: str, *, line_no: int, span: Span) -> UnaliasId:
 
 
 def _parse_charid_line(line: str, *, line_no: int, span: Span) -> CharId:
-    m = re.match(r"^@charid\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _CHARID_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @charid directive")
     rest = m.group(1).strip()
@@ -413,7 +443,7 @@ def _parse_charid_line(line: str, *, line_no: int, span: Span) -> CharId:
 
 
 def _parse_uncharid_line(line: str, *, line_no: int, span: Span) -> UncharId:
-    m = re.match(r"^@uncharid\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _UNCHARID_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @uncharid directive")
     cid = m.group(1).strip()
@@ -423,7 +453,7 @@ def _parse_uncharid_line(line: str, *, line_no: int, span: Span) -> UncharId:
 
 
 def _parse_avatarid_line(line: str, *, line_no: int, span: Span) -> AvatarId:
-    m = re.match(r"^@avatarid\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _AVATARID_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @avatarid directive")
     rest = m.group(1).strip()
@@ -439,7 +469,7 @@ def _parse_avatarid_line(line: str, *, line_no: int, span: Span) -> AvatarId:
 
 
 def _parse_unavatarid_line(line: str, *, line_no: int, span: Span) -> UnavatarId:
-    m = re.match(r"^@unavatarid\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _UNAVATARID_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @unavatarid directive")
     cid = m.group(1).strip()
@@ -449,13 +479,13 @@ def _parse_unavatarid_line(line: str, *, line_no: int, span: Span) -> UnavatarId
 
 
 def _parse_avatar_line(line: str, *, line_no: int, span: Span) -> AvatarOverride:
-    m = re.match(r"^@avatar\s+(.+)$", line.strip(), flags=re.IGNORECASE)
+    m = _AVATAR_LINE_RE.match(line.strip())
     if not m:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @avatar directive")
     rest = m.group(1).strip()
-    if "=" not in rest:
+    base_name, sep, asset_name = rest.partition("=")
+    if not sep:
         raise ValueError(f"{_loc(line_no, span.start_col)}: invalid @avatar directive (missing '=')")
-    base_name, asset_name = rest.split("=", 1)
     base_name = base_name.strip()
     asset_name = asset_name.strip()
     if not base_name:
@@ -463,29 +493,26 @@ def _parse_avatar_line(line: str, *, line_no: int, span: Span) -> AvatarOverride
     return AvatarOverride(line_no=line_no, span=span, name=base_name, asset=asset_name)
 
 
-def _parse_known_directive_line(token: str, line: str, *, line_no: int, span: Span) -> Node:
-    token_l = token.lower()
-    if token_l == "@usepack":
-        return _parse_usepack_line(line, line_no=line_no, span=span)
-    if token_l == "@alias":
-        return _parse_alias_line(line, line_no=line_no, span=span)
-    if token_l == "@tmpalias":
-        return _parse_tmpalias_line(line, line_no=line_no, span=span)
-    if token_l == "@aliasid":
-        return _parse_aliasid_line(line, line_no=line_no, span=span)
-    if token_l == "@unaliasid":
-        return _parse_unaliasid_line(line, line_no=line_no, span=span)
-    if token_l == "@charid":
-        return _parse_charid_line(line, line_no=line_no, span=span)
-    if token_l == "@uncharid":
-        return _parse_uncharid_line(line, line_no=line_no, span=span)
-    if token_l == "@avatarid":
-        return _parse_avatarid_line(line, line_no=line_no, span=span)
-    if token_l == "@unavatarid":
-        return _parse_unavatarid_line(line, line_no=line_no, span=span)
-    if token_l == "@avatar":
-        return _parse_avatar_line(line, line_no=line_no, span=span)
-    raise ValueError(f"{_loc(line_no, span.start_col)}: unsupported directive token: {token}")
+_DIRECTIVE_PARSERS: Dict[str, Callable[..., Node]] = {
+    "@usepack": _parse_usepack_line,
+    "@alias": _parse_alias_line,
+    "@tmpalias": _parse_tmpalias_line,
+    "@aliasid": _parse_aliasid_line,
+    "@unaliasid": _parse_unaliasid_line,
+    "@charid": _parse_charid_line,
+    "@uncharid": _parse_uncharid_line,
+    "@avatarid": _parse_avatarid_line,
+    "@unavatarid": _parse_unavatarid_line,
+    "@avatar": _parse_avatar_line,
+}
+
+
+def _starts_with_keyword(s: str, keyword: str) -> bool:
+    """Literal equivalent of `re.match(rf"^{keyword}\\b", s, re.IGNORECASE)` for a lowercase keyword."""
+    n = len(keyword)
+    if s[:n].lower() != keyword:
+        return False
+    return len(s) == n or not (s[n].isalnum() or s[n] == "_")
 
 
 def _split_reply_items(raw: str) -> List[str]:
@@ -508,7 +535,7 @@ def _parse_reply_block(
         if stripped == "" or stripped.startswith("#"):
             j += 1
             continue
-        if re.match(r"^@end\b", stripped, flags=re.IGNORECASE):
+        if _END_RE.match(stripped):
             if stripped.lower() != "@end":
                 col = _first_non_space_col(raw)
                 raise ValueError(f"{_loc(line_no, col)}: invalid @end directive (expected: @end)")
@@ -535,28 +562,13 @@ def _parse_reply_block(
     raise ValueError(f"line {start_line_no}: unterminated @reply block (missing @end)")
 
 
-def _is_known_directive_token(token: str) -> bool:
-    return token.lower() in {
-        "@alias",
-        "@tmpalias",
-        "@aliasid",
-        "@unaliasid",
-        "@charid",
-        "@uncharid",
-        "@avatarid",
-        "@unavatarid",
-        "@avatar",
-        "@usepack",
-    }
-
-
 class MMTLineParser:
     def __init__(self) -> None:
         self._nodes: List[Node] = []
 
     @staticmethod
     def _match_statement(line: str) -> Optional[Tuple[str, str, int, int]]:
-        m = re.match(r"^(\s*)([\-<>])(\s+)(.*)$", line)
+        m = _STATEMENT_RE.match(line)
         if not m:
             return None
         indent, kind, spaces, payload = m.group(1), m.group(2), m.group(3), m.group(4)
@@ -567,31 +579,31 @@ class MMTLineParser:
     def parse(self, text: str) -> List[Node]:
         self._nodes = []
         lines = _strip_bom(text).splitlines()
+        n_lines = len(lines)
 
         i = 0
-        while i < len(lines):
+        while i < n_lines:
             raw = lines[i]
-            stripped = raw.strip()
+            lstripped = raw.lstrip()
+            stripped = lstripped.rstrip()
             if stripped == "" or stripped.startswith("#"):
                 i += 1
                 continue
 
-            lstripped = raw.lstrip()
-            token = (lstripped.split(None, 1)[0] if lstripped.strip() else "").strip()
-            if token.startswith("@") and _is_known_directive_token(token):
+            # Every header form is an '@' directive; anything else (statements included) ends the header.
+            if stripped[:1] != "@":
+                break
+
+            parse_directive = _DIRECTIVE_PARSERS.get(lstripped.split(None, 1)[0].lower())
+            if parse_directive is not None:
                 line_no = i + 1
                 start_col = _first_non_space_col(raw)
                 span = Span(line_no, start_col, line_no, _line_end_col(raw))
-                self._nodes.append(_parse_known_directive_line(token, lstripped, line_no=line_no, span=span))
+                self._nodes.append(parse_directive(lstripped, line_no=line_no, span=span))
                 i += 1
                 continue
 
-            if self._match_statement(raw) is not None:
-                break
-
-            if re.match(r"^@reply\b", lstripped, flags=re.IGNORECASE) or re.match(
-                r"^@bond\b", lstripped, flags=re.IGNORECASE
-            ):
+            if _REPLY_RE.match(lstripped) or _BOND_RE.match(lstripped):
                 break
 
             m = HEADER_DIRECTIVE_RE.match(stripped)
@@ -616,7 +628,7 @@ class MMTLineParser:
             self._nodes.append(MetaKV(line_no=line_no, span=span, key=key, value=block_text))
             i = next_i
 
-        while i < len(lines):
+        while i < n_lines:
             raw = lines[i]
             line_no = i + 1
             stripped = raw.lstrip()
@@ -627,88 +639,89 @@ class MMTLineParser:
                 i += 1
                 continue
 
-            if re.match(r"^@reply\s*:", stripped, flags=re.IGNORECASE):
-                m = re.match(r"^@reply\s*:\s*(.*)$", stripped, flags=re.IGNORECASE)
-                payload = m.group(1) if m else ""
-                items = _split_reply_items(payload)
-                if not items:
-                    col = _first_non_space_col(raw)
-                    raise ValueError(f"{_loc(line_no, col)}: @reply requires at least one option")
-                start_col = _first_non_space_col(raw)
-                span = Span(line_no, start_col, line_no, _line_end_col(raw))
-                self._nodes.append(Reply(line_no=line_no, span=span, items=items))
-                i += 1
-                continue
-
-            if re.match(r"^@reply\b", stripped, flags=re.IGNORECASE):
-                if stripped.lower() != "@reply":
-                    col = _first_non_space_col(raw)
-                    raise ValueError(f"{_loc(line_no, col)}: invalid @reply directive (expected: @reply or @reply: ...)")
-                items, next_i, end_line, end_col = _parse_reply_block(
-                    all_lines=lines,
-                    start_index=i,
-                    start_line_no=line_no,
-                )
-                if not items:
-                    col = _first_non_space_col(raw)
-                    raise ValueError(f"{_loc(line_no, col)}: @reply block cannot be empty")
-                start_col = _first_non_space_col(raw)
-                span = Span(line_no, start_col, end_line, end_col)
-                self._nodes.append(Reply(line_no=line_no, span=span, items=items))
-                i = next_i
-                continue
+            if stripped[:1] == "@":
+                token = stripped.split(None, 1)[0]
+                parse_directive = _DIRECTIVE_PARSERS.get(token.lower())
+                if parse_directive is not None:
+                    start_col = _first_non_space_col(raw)
+                    span = Span(line_no, start_col, line_no, _line_end_col(raw))
+                    self._nodes.append(parse_directive(stripped, line_no=line_no, span=span))
+                    i += 1
+                    continue
 
-            if re.match(r"^@end\b", stripped, flags=re.IGNORECASE):
-                col = _first_non_space_col(raw)
-                raise ValueError(f"{_loc(line_no, col)}: unexpected @end without @reply")
+                m = _REPLY_INLINE_RE.match(stripped)
+                if m:
+                    payload = m.group(1)
+                    items = _split_reply_items(payload)
+                    if not items:
+                        col = _first_non_space_col(raw)
+                        raise ValueError(f"{_loc(line_no, col)}: @reply requires at least one option")
+                    start_col = _first_non_space_col(raw)
+                    span = Span(line_no, start_col, line_no, _line_end_col(raw))
+                    self._nodes.append(Reply(line_no=line_no, span=span, items=items))
+                    i += 1
+                    continue
 
-            if re.match(r"^@bond\b", stripped, flags=re.IGNORECASE):
-                m = re.match(r"^@bond(?:\s*:\s*(.*))?$", stripped, flags=re.IGNORECASE)
-                if not m:
-                    col = _first_non_space_col(raw)
-                    raise ValueError(f"{_loc(line_no, col)}: invalid @bond directive (expected: @bond or @bond: text)")
-                content_raw = m.group(1) or ""
-                start_col = _first_non_space_col(raw)
-                if content_raw:
-                    block_text, next_i, end_line, end_col = _parse_header_block(
-                        first_line_value=content_raw, all_lines=lines, start_index=i, start_line_no=line_no
+                if _REPLY_RE.match(stripped):
+                    if stripped.lower() != "@reply":
+                        col = _first_non_space_col(raw)
+                        raise ValueError(f"{_loc(line_no, col)}: invalid @reply directive (expected: @reply or @reply: ...)")
+                    items, next_i, end_line, end_col = _parse_reply_block(
+                        all_lines=lines,
+                        start_index=i,
+                        start_line_no=line_no,
                     )
+                    if not items:
+                        col = _first_non_space_col(raw)
+                        raise ValueError(f"{_loc(line_no, col)}: @reply block cannot be empty")
+                    start_col = _first_non_space_col(raw)
                     span = Span(line_no, start_col, end_line, end_col)
-                    self._nodes.append(Bond(line_no=line_no, span=span, content=block_text))
+                    self._nodes.append(Reply(line_no=line_no, span=span, items=items))
                     i = next_i
                     continue
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    block = _parse_triple_quote_block(
-                        head=next_line, all_lines=lines, start_index=i + 1, start_line_no=line_no + 1
-                    )
-                    if block is not None:
-                        block_text, next_i, end_line, end_col = block
+
+                if _END_RE.match(stripped):
+                    col = _first_non_space_col(raw)
+                    raise ValueError(f"{_loc(line_no, col)}: unexpected @end without @reply")
+
+                if _BOND_RE.match(stripped):
+                    m = _BOND_LINE_RE.match(stripped)
+                    if not m:
+                        col = _first_non_space_col(raw)
+                        raise ValueError(f"{_loc(line_no, col)}: invalid @bond directive (expected: @bond or @bond: text)")
+                    content_raw = m.group(1) or ""
+                    start_col = _first_non_space_col(raw)
+                    if content_raw:
+                        block_text, next_i, end_line, end_col = _parse_header_block(
+                            first_line_value=content_raw, all_lines=lines, start_index=i, start_line_no=line_no
+                        )
                         span = Span(line_no, start_col, end_line, end_col)
                         self._nodes.append(Bond(line_no=line_no, span=span, content=block_text))
                         i = next_i
                         continue
-                span = Span(line_no, start_col, line_no, _line_end_col(raw))
-                self._nodes.append(Bond(line_no=line_no, span=span, content=""))
-                i += 1
-                continue
-
-            if re.match(r"^@pagebreak\b", stripped, flags=re.IGNORECASE):
-                if stripped.strip().lower() != "@pagebreak":
-                    col = _first_non_space_col(raw)
-                    raise ValueError(f"{_loc(line_no, col)}: invalid @pagebreak directive (expected: @pagebreak)")
-                start_col = _first_non_space_col(raw)
-                span = Span(line_no, start_col, line_no, _line_end_col(raw))
-                self._nodes.append(PageBreak(line_no=line_no, span=span))
-                i += 1
-                continue
+                    if i + 1 < n_lines:
+                        next_line = lines[i + 1].strip()
+                        block = _parse_triple_quote_block(
+                            head=next_line, all_lines=lines, start_index=i + 1, start_line_no=line_no + 1
+                        )
+                        if block is not None:
+                            block_text, next_i, end_line, end_col = block
+                            span = Span(line_no, start_col, end_line, end_col)
+                            self._nodes.append(Bond(line_no=line_no, span=span, content=block_text))
+                            i = next_i
+                            continue
+                    span = Span(line_no, start_col, line_no, _line_end_col(raw))
+                    self._nodes.append(Bond(line_no=line_no, span=span, content=""))
+                    i += 1
+                    continue
 
-            if stripped.startswith("@"):
-                token = (stripped.split(None, 1)[0] if stripped.strip() else "").strip()
-                if _is_known_directive_token(token):
+                if _starts_with_keyword(stripped, "@pagebreak"):
+                    if stripped.strip().lower() != "@pagebreak":
+                        col = _first_non_space_col(raw)
+                        raise ValueError(f"{_loc(line_no, col)}: invalid @pagebreak directive (expected: @pagebreak)")
                     start_col = _first_non_space_col(raw)
                     span = Span(line_no, start_col, line_no, _line_end_col(raw))
-                    self._nodes.append(_parse_known_directive_line(token, stripped, line_no=line_no, span=span))
+                    self._nodes.append(PageBreak(line_no=line_no, span=span))
                     i += 1
                     continue
 
@@ -23,28 +23,43 @@ def _cosine_top_k_numpy(matrix: "np.ndarray", query: "np.ndarray", top_k: int) -
     return list(idx.astype(int).tolist())
 
 
+def _normalize_py(vec: Sequence[float]) -> List[float]:
+    n = math.sqrt(sum(float(x) * float(x) for x in vec)) or 1.0
+    return [float(x) / n for x in vec]
+
+
 def _cosine_top_k_py(vectors: Sequence[Sequence[float]], query: Sequence[float], top_k: int) -> List[int]:
-    # Normalize query
-    qn = math.sqrt(sum(float(x) * float(x) for x in query)) or 1.0
-    q = [float(x) / qn for x in query]
+    # vectors: already normalized (see EmbeddingIndex.build); only the query is normalized here.
+    q = _normalize_py(query)
 
     scored: List[Tuple[int, float]] = []
     for i, vec in enumerate(vectors):
-        vn = math.sqrt(sum(float(x) * float(x) for x in vec)) or 1.0
         dot = 0.0
         # assume same length
         for a, b in zip(vec, q):
-            dot += (float(a) / vn) * float(b)
+            dot += a * b
         scored.append((i, dot))
     scored.sort(key=lambda x: x[1], reverse=True)
     return [i for i, _ in scored[: max(0, int(top_k))]]
 
 
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    if np is not None:
+        va = np.asarray(a, dtype=np.float32)
+        vb = np.asarray(b, dtype=np.float32)
+        denom = float(np.linalg.norm(va)) * float(np.linalg.norm(vb))
+        return float(va @ vb) / denom if denom else 0.0
+    dot = sum(float(x) * float(y) for x, y in zip(a, b))
+    denom = math.sqrt(sum(float(x) * float(x) for x in a)) * math.sqrt(sum(float(y) * float(y) for y in b))
+    return dot / denom if denom else 0.0
+
+
 @dataclass
 class EmbeddingIndex:
     """
     In-memory cosine-similarity index for a small list of vectors (<= a few hundred).
-    Stores normalized float32 matrix when numpy is available.
+    Vectors are normalized once at build time: a float32 matrix when numpy is available,
+    otherwise `vectors` (Python floats) for the pure-Python fallback.
     """
 
     vectors: List[List[float]]
@@ -52,14 +67,13 @@ class EmbeddingIndex:
 
     @classmethod
     def build(cls, vectors: Sequence[Sequence[float]]) -> "EmbeddingIndex":
-        vlist = [list(map(float, v)) for v in vectors]
-        idx = cls(vectors=vlist)
-        if np is not None and vlist:
-            mat = np.asarray(vlist, dtype=np.float32)
+        if np is not None and len(vectors):
+            mat = np.asarray(vectors, dtype=np.float32)
             norms = np.linalg.norm(mat, axis=1, keepdims=True)
             norms = np.where(norms == 0, 1.0, norms)
-            idx._mat = mat / norms
-        return idx
+            # A Python float list costs ~8x the float32 matrix; top_k only needs the matrix.
+            return cls(vectors=[], _mat=mat / norms)
+        return cls(vectors=[_normalize_py(v) for v in vectors])
 
     def top_k(self, query: Sequence[float], top_k: int) -> List[int]:
         if top_k <= 0:
@@ -37,6 +37,9 @@ def is_url_like(s: str) -> bool:
         return True
     if s.startswith("//"):
         return True
+    # Cheap reject before urlparse: only http(s) URLs can pass below (scheme is case-insensitive).
+    if not s[:8].lower().startswith(("http://", "https://")):
+        return False
     try:
         u = urlparse(s)
         if u.scheme in {"http", "https"} and u.netloc:
@@ -30,6 +30,11 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
 
 SPEAKER_BACKREF_RE = re.compile(r"^_(\d*)\s*:\s*(.*)$")
 SPEAKER_INDEX_RE = re.compile(r"^~(\d*)\s*:\s*(.*)$")
@@ -64,6 +69,9 @@ def _is_url_like(s: str) -> bool:
         return True
     if s.startswith("//"):
         return True
+    # Cheap reject before urlparse: only http(s) URLs can pass below (scheme is case-insensitive).
+    if not s[:8].lower().startswith(("http://", "https://")):
+        return False
     try:
         u = urlparse(s)
         return u.scheme in ("http", "https") and bool(u.netloc)
@@ -96,7 +104,7 @@ def _avatar_ref(avatar_path: Path, avatar_dir: Path) -> str:
     return f"{avatar_dir.name}/{avatar_path.name}".replace("\\", "/")
 
 
-@dataclass
+@dataclass(slots=True)
 class SpeakerState:
     current: Optional[str] = None
     history: List[str] = None  # resolved speaker history (includes backrefs)
@@ -111,37 +119,41 @@ class SpeakerState:
     def set_explicit(self, name: str) -> str:
         name = name.strip()
         self.current = name
-        if not self.history or self.history[-1] != name:
-            self.history.append(name)
-        if name not in self.unique_first_seen:
-            self.unique_first_seen.append(name)
+        history = self.history
+        if not history or history[-1] != name:
+            history.append(name)
+        seen = self.unique_first_seen
+        if name not in seen:
+            seen.append(name)
         return name
 
     def set_backref(self, n: int) -> str:
         if n <= 0:
             raise ValueError("backref n must be a positive integer")
+        history = self.history
         # _1 means "previous speaker", so we need at least 2 speakers in history.
-        idx = -(n + 1)
-        if len(self.history) < (n + 1):
+        if len(history) < (n + 1):
             raise ValueError(f"not enough speaker history for _{n}:")
-        self.current = self.history[idx]
+        current = self.current = history[-(n + 1)]
         # Append resolved speaker so repeated backrefs like `_: ...` can alternate naturally
         # after seeding two explicit speakers (e.g. A, B, _, _, _ ... -> A, B, A, B, A ...).
-        if not self.history or self.history[-1] != self.current:
-            self.history.append(self.current)
-        return self.current
+        if history[-1] != current:
+            history.append(current)
+        return current
 
     def set_index(self, n: int) -> str:
         if n <= 0:
             raise ValueError("index n must be a positive integer")
-        if len(self.unique_first_seen) < n:
+        seen = self.unique_first_seen
+        if len(seen) < n:
             raise ValueError(f"not enough unique speakers for ~{n}:")
-        self.current = self.unique_first_seen[n - 1]
+        current = self.current = seen[n - 1]
         # Treat as an explicit selection, but avoid duplicating the last entry.
         # This makes `~n` both a stable reference and friendly with subsequent `_` toggling.
-        if not self.history or self.history[-1] != self.current:
-            self.history.append(self.current)
-        return self.current
+        history = self.history
+        if not history or history[-1] != current:
+            history.append(current)
+        return current
 
 
 def _parse_payload(payload: str) -> Tuple[Optional[Tuple[str, Any]], str]:
@@ -202,12 +214,29 @@ def _parse_payload(payload: str) -> Tuple[Optional[Tuple[str, Any]], str]:
     return None, payload
 
 
+# str(path) -> (file mtime_ns, parsed mapping); lets repeated conversions skip re-reading the file.
+_NAME_TO_ID_CACHE: Dict[str, Tuple[int, Dict[str, int]]] = {}
+
+
 def _load_name_to_id(path: Path) -> Dict[str, int]:
-    if not path.exists():
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        # Missing or unreachable (ENOTDIR, permissions, ...): same as the old exists() check.
         return {}
-    data = json.loads(path.read_text(encoding="utf-8"))
-    mapping = data.get("name_to_id") or {}
-    return {str(k): int(v) for k, v in mapping.items()}
+    key = str(path)
+    cached = _NAME_TO_ID_CACHE.get(key)
+    if cached is None or cached[0] != mtime_ns:
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return {}
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw.decode("utf-8"))
+        mapping = data.get("name_to_id") or {}
+        cached = (mtime_ns, {str(k): int(v) for k, v in mapping.items()})
+        _NAME_TO_ID_CACHE[key] = cached
+    # Callers own the returned dict; keep the cached copy pristine.
+    return dict(cached[1])
 
 
 def _build_base_index(name_to_id: Dict[str, int]) -> Dict[str, List[int]]:
@@ -227,6 +256,44 @@ def _find_avatar_file(avatar_dir: Path, student_id: int) -> Optional[Path]:
     return None
 
 
+def _dump_json_bytes(obj: Any) -> bytes:
+    # Same layout as json.dumps(..., ensure_ascii=False, indent=2), UTF-8 encoded (orjson only spells some floats differently).
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _write_json_streaming(path: Path, data: Dict[str, Any]) -> None:
+    """
+    Write `data` exactly as `_dump_json_bytes(data)` would, but serialize top-level lists item by item,
+    so a long `chat` never exists as one giant string next to the data itself.
+    """
+    with path.open("wb") as f:
+        if not data:
+            f.write(b"{}")
+            return
+        f.write(b"{")
+        for n, (key, value) in enumerate(data.items()):
+            f.write(b"\n  " if n == 0 else b",\n  ")
+            f.write(_dump_json_bytes(str(key)))
+            f.write(b": ")
+            if isinstance(value, list) and value:
+                f.write(b"[")
+                for m, item in enumerate(value):
+                    f.write(b"\n    " if m == 0 else b",\n    ")
+                    # JSON text has no raw newlines inside strings, so re-indenting by line is safe.
+                    f.write(_dump_json_bytes(item).replace(b"\n", b"\n    "))
+                f.write(b"\n  ]")
+            else:
+                f.write(_dump_json_bytes(value).replace(b"\n", b"\n  "))
+        f.write(b"\n}")
+
+
+def clear_caches() -> None:
+    """Drop the cached name_to_id.json mappings (e.g. after editing the file in-process)."""
+    _NAME_TO_ID_CACHE.clear()
+
+
 def _resolve_student_id(name: str, name_to_id: Dict[str, int], base_index: Dict[str, List[int]]) -> Optional[int]:
     name = name.strip()
     if not name:
@@ -350,9 +417,9 @@ def main() -> int:
         typst_mode=bool(args.typst),
     )
 
-    out_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    _write_json_streaming(out_path, data)
     if args.report:
-        Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        Path(args.report).write_bytes(_dump_json_bytes(report))
     else:
         # Print a tiny summary for interactive use.
         unresolved = sum(report["unresolved_speakers"].values())
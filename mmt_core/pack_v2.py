@@ -1,34 +1,62 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import pickle
 import re
+import sys
+import tempfile
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
 
 
 _PACK_ID_RE = re.compile(r"^[A-Za-z0-9_]+$")
+_DRIVE_RE = re.compile(r"^[A-Za-z]:")
+_PARENT_SEG_RE = re.compile(r"(?:^|/)\.\.(?:/|$)")
+# Only "", "." segments, i.e. the path names nothing below the pack root.
+_EMPTY_RELPATH_RE = re.compile(r"^(?:\.?/)*\.?$")
+
+
+def _loads(raw: bytes) -> Any:
+    # Parse UTF-8 JSON bytes; orjson skips the intermediate str. Shared with resolve_expressions' tag loaders.
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
 
 
 def _read_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return _loads(path.read_bytes())
+
+
+def _field_str(v: Any) -> str:
+    # Manifest string fields: missing/falsy -> "", anything else stringified and stripped.
+    return str(v).strip() if v else ""
 
 
+@lru_cache(maxsize=4096)
 def _is_safe_relpath(s: str) -> bool:
     ss = (s or "").strip().replace("\\", "/")
     if not ss:
         return False
     if "://" in ss or ss.startswith("//"):
         return False
-    if re.match(r"^[A-Za-z]:", ss):
+    if _DRIVE_RE.match(ss):
         return False
-    parts = [p for p in ss.split("/") if p not in ("", ".")]
-    if not parts or any(p == ".." for p in parts):
+    if _PARENT_SEG_RE.search(ss) or _EMPTY_RELPATH_RE.match(ss):
         return False
     return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PackManifest:
     pack_id: str
     name: str = ""
@@ -39,7 +67,7 @@ class PackManifest:
     eula_url: str = ""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CharacterAssets:
     char_id: str
     avatar: str  # relpath under pack root; may be "" for extension packs (inherit from base)
@@ -47,12 +75,12 @@ class CharacterAssets:
     tags: str = "tags.json"  # file name under expressions_dir
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PackV2:
     root: Path
     manifest: PackManifest
-    aliases_to_id: Dict[str, str]
-    id_to_assets: Dict[str, CharacterAssets]
+    aliases_to_id: Mapping[str, str]
+    id_to_assets: Mapping[str, CharacterAssets]
 
     def resolve_char_id(self, token: str) -> Optional[str]:
         t = (token or "").strip()
@@ -71,8 +99,109 @@ class PackV2:
         return (self.root / assets.avatar).resolve()
 
 
+# Parsed packs are cached in-process and on disk, keyed by the (mtime_ns, size) of the pack's json files.
+# Bump the version whenever loading/validation rules change. Set MMT_PACK_V2_CACHE=0 to disable the disk cache.
+_PACK_CACHE_VERSION = 2
+
+
+def _default_pack_cache_dir() -> Path:
+    # Per-user cache dir, never the working dir: cache files are unpickled, so only the user should write them.
+    xdg = os.getenv("XDG_CACHE_HOME", "").strip()
+    base = Path(xdg) if xdg else Path("~/.cache").expanduser()
+    return base / "mmt" / "pack_v2"
+
+
+_PACK_CACHE_DIR = Path(os.getenv("MMT_PACK_V2_CACHE_DIR", "").strip() or _default_pack_cache_dir())
+_PACK_MEMO: Dict[str, Tuple[Tuple[Any, ...], "PackV2"]] = {}
+
+
+def _pack_signature(pack_root: Path) -> Optional[Tuple[Any, ...]]:
+    sig: list[Any] = [_PACK_CACHE_VERSION]
+    for name in ("manifest.json", "char_id.json", "asset_mapping.json"):
+        try:
+            st = os.stat(pack_root / name)
+        except FileNotFoundError:
+            if name == "char_id.json":
+                sig.append(None)
+                continue
+            return None
+        sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _disk_cache_enabled() -> bool:
+    return os.getenv("MMT_PACK_V2_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _disk_cache_path(pack_root: Path) -> Path:
+    key = hashlib.sha1(str(pack_root).encode("utf-8")).hexdigest()[:16]
+    return _PACK_CACHE_DIR / f"{pack_root.name}-{key}.pkl"
+
+
+def _read_disk_cache(pack_root: Path, sig: Tuple[Any, ...]) -> Optional["PackV2"]:
+    try:
+        with _disk_cache_path(pack_root).open("rb") as f:
+            root_s, cached_sig, pack = pickle.load(f)
+    except Exception:
+        return None
+    if root_s != str(pack_root) or cached_sig != sig or not isinstance(pack, PackV2):
+        return None
+    return pack
+
+
+def _write_disk_cache(pack_root: Path, sig: Tuple[Any, ...], pack: "PackV2") -> None:
+    # Best-effort: a read-only or missing cache dir just means no disk cache.
+    try:
+        path = _disk_cache_path(pack_root)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((str(pack_root), sig, pack), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    except Exception:
+        pass
+
+
+def _read_only(pack: PackV2) -> PackV2:
+    # The memoized pack is shared by every caller: hand out read-only views of its maps.
+    return PackV2(
+        root=pack.root,
+        manifest=pack.manifest,
+        aliases_to_id=MappingProxyType(pack.aliases_to_id),
+        id_to_assets=MappingProxyType(pack.id_to_assets),
+    )
+
+
 def load_pack_v2(pack_root: Path) -> PackV2:
     pack_root = Path(pack_root).resolve()
+    sig = _pack_signature(pack_root)
+    if sig is None:
+        # Missing files: let the real loader raise the proper error.
+        return _load_pack_v2_uncached(pack_root)
+
+    memo_key = str(pack_root)
+    hit = _PACK_MEMO.get(memo_key)
+    if hit is not None and hit[0] == sig:
+        return _read_only(hit[1])
+
+    use_disk = _disk_cache_enabled()
+    pack = _read_disk_cache(pack_root, sig) if use_disk else None
+    if pack is None:
+        pack = _load_pack_v2_uncached(pack_root)
+        if use_disk:
+            _write_disk_cache(pack_root, sig, pack)
+    _PACK_MEMO[memo_key] = (sig, pack)
+    return _read_only(pack)
+
+
+def _load_pack_v2_uncached(pack_root: Path) -> PackV2:
     if not pack_root.exists():
         raise FileNotFoundError(pack_root)
 
@@ -91,19 +220,21 @@ def load_pack_v2(pack_root: Path) -> PackV2:
     raw_manifest = _read_json(manifest_path)
     if not isinstance(raw_manifest, dict):
         raise ValueError("manifest.json must be an object")
-    mid = str(raw_manifest.get("pack_id") or "").strip()
+    mid = _field_str(raw_manifest.get("pack_id"))
     if mid and mid != pack_id:
         raise ValueError(f"manifest.pack_id mismatch: {mid} != {pack_id}")
 
-    eula = raw_manifest.get("eula") if isinstance(raw_manifest.get("eula"), dict) else {}
+    eula = raw_manifest.get("eula")
+    if not isinstance(eula, dict):
+        eula = {}
     manifest = PackManifest(
         pack_id=pack_id,
-        name=str(raw_manifest.get("name") or "").strip(),
-        version=str(raw_manifest.get("version") or "").strip(),
-        type=str(raw_manifest.get("type") or "base").strip() or "base",
-        eula_required=bool(eula.get("required")) if isinstance(eula, dict) else False,
-        eula_title=str(eula.get("title") or "").strip() if isinstance(eula, dict) else "",
-        eula_url=str(eula.get("url") or "").strip() if isinstance(eula, dict) else "",
+        name=_field_str(raw_manifest.get("name")),
+        version=_field_str(raw_manifest.get("version")),
+        type=_field_str(raw_manifest.get("type")) or "base",
+        eula_required=bool(eula.get("required")),
+        eula_title=_field_str(eula.get("title")),
+        eula_url=_field_str(eula.get("url")),
     )
 
     raw_alias: Any
@@ -115,15 +246,11 @@ def load_pack_v2(pack_root: Path) -> PackV2:
         # `char_id.json` is optional: ids are always resolvable by themselves.
         # This makes extension packs easier to prototype (aliases can be added later).
         raw_alias = {}
-    aliases: Dict[str, str] = {}
-    for k, v in raw_alias.items():
-        if not isinstance(k, str) or not isinstance(v, str):
-            continue
-        kk = k.strip()
-        vv = v.strip()
-        if not kk or not vv:
-            continue
-        aliases[kk] = vv
+    aliases: Dict[str, str] = {
+        sys.intern(kk): sys.intern(vv)
+        for k, v in raw_alias.items()
+        if isinstance(k, str) and isinstance(v, str) and (kk := k.strip()) and (vv := v.strip())
+    }
 
     raw_map = _read_json(mapping_path)
     if not isinstance(raw_map, dict):
@@ -133,12 +260,13 @@ def load_pack_v2(pack_root: Path) -> PackV2:
     for char_id, obj in raw_map.items():
         if not isinstance(char_id, str) or not isinstance(obj, dict):
             continue
-        cid = char_id.strip()
+        # Interned: the same ids are used as keys here, as alias targets, and in every compiled message.
+        cid = sys.intern(char_id.strip())
         if not cid:
             continue
-        avatar = str(obj.get("avatar") or "").strip()
-        expr_dir = str(obj.get("expressions_dir") or "").strip()
-        tags = str(obj.get("tags") or "tags.json").strip() or "tags.json"
+        avatar = _field_str(obj.get("avatar"))
+        expr_dir = _field_str(obj.get("expressions_dir"))
+        tags = _field_str(obj.get("tags")) or "tags.json"
         if not avatar:
             if manifest.type != "extension":
                 raise ValueError(f"missing avatar path for {cid} in base pack")
@@ -151,23 +279,40 @@ def load_pack_v2(pack_root: Path) -> PackV2:
             raise ValueError(f"invalid tags file name for {cid}: {tags}")
         id_to_assets[cid] = CharacterAssets(char_id=cid, avatar=avatar, expressions_dir=expr_dir, tags=tags)
 
-    # Ensure self ids are resolvable even without aliases.
-    for cid in id_to_assets.keys():
-        aliases.setdefault(cid, cid)
+    # Ensure self ids are resolvable even without aliases (explicit aliases win).
+    aliases.update({cid: cid for cid in id_to_assets if cid not in aliases})
 
     return PackV2(root=pack_root, manifest=manifest, aliases_to_id=aliases, id_to_assets=id_to_assets)
 
 
+def _dir_entry_names(d: Path) -> set[str]:
+    try:
+        with os.scandir(d) as it:
+            # is_file()/is_dir() follow symlinks, so dangling links are skipped like Path.exists() would.
+            return {e.name for e in it if e.is_file() or e.is_dir()}
+    except OSError:
+        return set()
+
+
 def validate_pack_v2(pack_root: Path) -> None:
     pack = load_pack_v2(pack_root)
     # Basic file existence checks (best-effort)
+    # Avatars usually share one directory: list it once instead of stat-ing every file. A name missing
+    # from the listing still gets a real exists() check (e.g. case-insensitive filesystems).
+    listings: Dict[Path, set[str]] = {}
+
+    def _exists(p: Path) -> bool:
+        names = listings.get(p.parent)
+        if names is None:
+            names = listings[p.parent] = _dir_entry_names(p.parent)
+        return p.name in names or p.exists()
+
     for cid, assets in pack.id_to_assets.items():
-        _ = assets
         avatar = None
         if assets.avatar:
             avatar = pack.avatar_path(cid)
         tags = pack.tags_path(cid)
-        if avatar is not None and not avatar.exists():
+        if avatar is not None and not _exists(avatar):
             raise FileNotFoundError(f"missing avatar for {cid}: {avatar}")
         if not tags.exists():
             raise FileNotFoundError(f"missing tags.json for {cid}: {tags}")
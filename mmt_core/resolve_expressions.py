@@ -5,15 +5,17 @@ import asyncio
 import json
 import os
 import re
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
 
 try:
-    from mmt_core.embedding_index import EmbeddingIndex
+    from mmt_core.embedding_index import EmbeddingIndex, cosine_similarity
     from mmt_core.siliconflow_embed import SiliconFlowEmbedConfig, SiliconFlowEmbedder
 except ModuleNotFoundError:  # pragma: no cover
-    from embedding_index import EmbeddingIndex  # type: ignore
+    from embedding_index import EmbeddingIndex, cosine_similarity  # type: ignore
     from siliconflow_embed import SiliconFlowEmbedConfig, SiliconFlowEmbedder  # type: ignore
 
 try:
@@ -27,27 +29,47 @@ except ModuleNotFoundError:  # pragma: no cover
     from external_assets import ExternalAssetConfig, ExternalAssetDownloader, is_url_like  # type: ignore
 
 try:
-    from mmt_core.pack_v2 import PackV2, load_pack_v2
+    from mmt_core.mmt_text_to_json import _write_json_streaming
+except ModuleNotFoundError:  # pragma: no cover
+    from mmt_text_to_json import _write_json_streaming  # type: ignore
+
+try:
+    from mmt_core.pack_v2 import PackV2, _loads as _json_loads, load_pack_v2
 except ModuleNotFoundError:  # pragma: no cover
     PackV2 = None  # type: ignore
     load_pack_v2 = None  # type: ignore
+    _json_loads = json.loads  # type: ignore
 
+try:
+    from loguru import logger  # type: ignore
+except Exception:  # pragma: no cover
+    import logging
 
-@dataclass(frozen=True)
+    _logger = logging.getLogger("mmt_resolve")
+    if not _logger.handlers:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logger = _logger  # type: ignore
+
+
+@dataclass(frozen=True, slots=True)
 class CandidateDoc:
     image_name: str
     tags: List[str]
     description: str
+    # Reranker/embedding document text, built once at construction.
+    text: str = field(init=False, repr=False, compare=False)
 
-    def to_doc_text(self) -> str:
-        return json.dumps(
-            {"image_name": self.image_name, "tags": self.tags, "description": self.description},
-            ensure_ascii=False,
-            separators=(",", ":"),
-        )
+    def __post_init__(self) -> None:
+        # Keep this short and reranker-friendly: description + tags.
+        tags = ", ".join(self.tags[:32])
+        if tags:
+            text = f"{self.description}\nTags: {tags}\nFile: {self.image_name}"
+        else:
+            text = f"{self.description}\nFile: {self.image_name}"
+        object.__setattr__(self, "text", text)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CandidateItem:
     doc: CandidateDoc
     image_path: Path
@@ -60,6 +82,9 @@ def _default_pack_v2_root() -> Optional[Path]:
     return None
 
 
+_DIGITS_RE = re.compile(r"\d+")
+
+
 def _image_order_key(image_name: str) -> tuple[int, str]:
     """
     Prefer numeric suffix order (e.g. xxx.png, xxx1.png, xxx2.png, xxx10.png, ...).
@@ -67,18 +92,17 @@ def _image_order_key(image_name: str) -> tuple[int, str]:
     """
     s = (image_name or "").strip()
     stem = s.rsplit(".", 1)[0]
-    nums = re.findall(r"\d+", stem)
+    nums = _DIGITS_RE.findall(stem)
     n = int(nums[-1]) if nums else -1
     return (n, s.lower())
 
 
-def _load_tags_for_student(tags_root: Path, student_id: int) -> List[CandidateDoc]:
-    p = tags_root / str(student_id) / "tags.json"
-    if not p.exists():
-        return []
-    raw = json.loads(p.read_text(encoding="utf-8"))
+@lru_cache(maxsize=256)
+def _load_tags_cached(path: str, mtime_ns: int, size: int) -> Tuple[CandidateDoc, ...]:
+    # Keyed by (mtime_ns, size) so an edited tags.json is reparsed; callers get fresh lists.
+    raw = _json_loads(Path(path).read_bytes())
     if not isinstance(raw, list):
-        return []
+        return ()
     docs: List[CandidateDoc] = []
     for item in raw:
         if not isinstance(item, dict):
@@ -93,39 +117,23 @@ def _load_tags_for_student(tags_root: Path, student_id: int) -> List[CandidateDo
         desc = str(item.get("description") or "")
         docs.append(CandidateDoc(image_name=img, tags=tags, description=desc))
     docs.sort(key=lambda d: _image_order_key(d.image_name))
-    return docs
+    return tuple(docs)
 
 
-def _load_tags_for_pack_char(pack: "PackV2", char_id: str) -> List[CandidateDoc]:
-    p = pack.tags_path(char_id)
-    if not p.exists():
+def _load_tags_file(p: Path) -> List[CandidateDoc]:
+    try:
+        st = p.stat()
+    except OSError:
         return []
-    raw = json.loads(p.read_text(encoding="utf-8"))
-    if not isinstance(raw, list):
-        return []
-    docs: List[CandidateDoc] = []
-    for item in raw:
-        if not isinstance(item, dict):
-            continue
-        img = str(item.get("image_name") or "")
-        if not img:
-            continue
-        tags = item.get("tags") or []
-        if not isinstance(tags, list):
-            tags = []
-        tags = [str(x) for x in tags if isinstance(x, str)]
-        desc = str(item.get("description") or "")
-        docs.append(CandidateDoc(image_name=img, tags=tags, description=desc))
-    docs.sort(key=lambda d: _image_order_key(d.image_name))
-    return docs
+    return list(_load_tags_cached(str(p), st.st_mtime_ns, st.st_size))
 
 
-def _doc_text(candidate: CandidateDoc) -> str:
-    # Keep this short and reranker-friendly: description + tags.
-    tags = ", ".join(candidate.tags[:32])
-    if tags:
-        return f"{candidate.description}\nTags: {tags}\nFile: {candidate.image_name}"
-    return f"{candidate.description}\nFile: {candidate.image_name}"
+def _load_tags_for_student(tags_root: Path, student_id: int) -> List[CandidateDoc]:
+    return _load_tags_file(tags_root / str(student_id) / "tags.json")
+
+
+def _load_tags_for_pack_char(pack: "PackV2", char_id: str) -> List[CandidateDoc]:
+    return _load_tags_file(pack.tags_path(char_id))
 
 
 def _assets_from_meta(meta: Dict[str, Any]) -> Dict[str, str]:
@@ -147,11 +155,22 @@ def _assets_from_meta(meta: Dict[str, Any]) -> Dict[str, str]:
     return assets
 
 
-def _asset_value(meta: Dict[str, Any], name: str) -> Optional[str]:
-    if not name:
+def _segment_download_url(seg: Any, assets: Dict[str, str]) -> Optional[str]:
+    """External URL that resolving an asset/image/expr segment downloads, if any."""
+    if not isinstance(seg, dict):
         return None
-    v = (meta or {}).get(f"asset.{name}")
-    return v.strip() if isinstance(v, str) and v.strip() else None
+    seg_type = seg.get("type")
+    if seg_type == "asset":
+        url = assets.get(str(seg.get("name") or "").strip()) or ""
+    elif seg_type == "image":
+        url = str(seg.get("ref") or "").strip()
+    elif seg_type == "expr":
+        url = str(seg.get("query") or "").strip()
+    else:
+        return None
+    if url and not url.startswith("data:image/") and is_url_like(url):
+        return url
+    return None
 
 
 def _safe_cache_filename(name: str) -> Optional[str]:
@@ -163,16 +182,16 @@ def _safe_cache_filename(name: str) -> Optional[str]:
     return s
 
 
-def _rewrite_asset_ref(ref: str, meta: Dict[str, Any]) -> str:
+def _rewrite_asset_ref(ref: str, assets: Dict[str, str]) -> str:
     s = (ref or "").strip()
     if s.lower().startswith("asset:"):
         name = s.split(":", 1)[1].strip()
-        v = _asset_value(meta, name)
+        v = assets.get(name)
         return v or ref
     return ref
 
 
-def _apply_avatar_overrides(data: Dict[str, Any], meta: Dict[str, Any]) -> None:
+def _apply_avatar_overrides(data: Dict[str, Any], assets: Dict[str, str]) -> None:
     # Backward compatibility:
     # Older JSON schema used a global `avatar_overrides: {char_id: asset_name}` to rewrite
     # `custom_chars`' avatar refs (global/static). The current pipeline prefers per-line
@@ -192,18 +211,18 @@ def _apply_avatar_overrides(data: Dict[str, Any], meta: Dict[str, Any]) -> None:
         if isinstance(char_id, str):
             asset_name = overrides.get(char_id)
             if isinstance(asset_name, str) and asset_name.strip():
-                v = _asset_value(meta, asset_name.strip())
+                v = assets.get(asset_name.strip())
                 if v:
                     avatar_ref = v
         new_cc.append([char_id, avatar_ref, display])
     data["custom_chars"] = new_cc
 
 
-def _rewrite_line_avatar_override(line: Dict[str, Any], meta: Dict[str, Any]) -> None:
+def _rewrite_line_avatar_override(line: Dict[str, Any], assets: Dict[str, str]) -> None:
     v = line.get("avatar_override")
     if not isinstance(v, str) or not v.strip():
         return
-    vv = _rewrite_asset_ref(v, meta)
+    vv = _rewrite_asset_ref(v, assets)
     if isinstance(vv, str) and vv.strip().lower().startswith("asset:"):
         # Missing asset mapping: drop override to avoid Typst trying to load an invalid path,
         # but keep a warning marker for the caller.
@@ -214,31 +233,37 @@ def _rewrite_line_avatar_override(line: Dict[str, Any], meta: Dict[str, Any]) ->
     line["avatar_override"] = vv
 
 
+_TYPST_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+_TYPST_ASSET_IMG = (
+    "#let asset_img(name, width: auto, height: auto, fit: \"contain\") = {"
+    " let p = asset.at(name, default: none);"
+    " if p == none { none } else { image(p, width: width, height: height, fit: fit) }"
+    "}"
+)
+
+
 def _escape_typst_string(s: str) -> str:
-    return s.replace("\\", "\\\\").replace('"', '\\"')
+    return s.translate(_TYPST_ESCAPE)
 
 
-def _build_typst_assets_global(meta: Dict[str, Any]) -> str:
-    assets = _assets_from_meta(meta)
+def _build_typst_assets_global(assets: Dict[str, str]) -> str:
     if not assets:
         return ""
     # Expose a simple Typst API:
     #   - `asset`: a dict mapping names -> image refs
     #   - `asset_img(name, ..)` returns an `image(...)` for the mapped ref
-    lines = ["#let asset = (:)"]
-    for name in sorted(assets.keys()):
-        v = assets[name]
-        lines.append(f'#asset.insert("{_escape_typst_string(name)}", "{_escape_typst_string(v)}")')
-    lines.append(
-        "#let asset_img(name, width: auto, height: auto, fit: \"contain\") = {"
-        " let p = asset.at(name, default: none);"
-        " if p == none { none } else { image(p, width: width, height: height, fit: fit) }"
-        "}"
+    body = "\n".join(
+        f'#asset.insert("{name.translate(_TYPST_ESCAPE)}", "{assets[name].translate(_TYPST_ESCAPE)}")'
+        for name in sorted(assets)
     )
-    return "\n".join(lines) + "\n"
+    return f"#let asset = (:)\n{body}\n{_TYPST_ASSET_IMG}\n"
+
 
+# Direct by-index expression queries: `#5`, `#ex:12`, `#ex.12`.
+_DIRECT_INDEX_RE = re.compile(r"^#\s*(?:(?P<alias>[A-Za-z0-9_]+)\s*[:.]\s*)?(?P<n>\d+)\s*$")
 
-_LOCAL_ASSET_EXTS = {"png", "jpg", "jpeg", "webp", "gif", "bmp", "svg"}
+_LOCAL_ASSET_EXTS = frozenset({"png", "jpg", "jpeg", "webp", "gif", "bmp", "svg"})
 
 
 def _normalize_local_asset_ref(raw: str, *, allowed_prefixes: List[str]) -> Optional[str]:
@@ -252,37 +277,33 @@ def _normalize_local_asset_ref(raw: str, *, allowed_prefixes: List[str]) -> Opti
     Returns: '/prefix/.../file.ext' or None if invalid.
     """
     s = (raw or "").strip().replace("\\", "/")
-    if not s:
-        return None
     if s.startswith("./"):
         s = s[2:]
-    if s.startswith("/"):
-        s = s[1:]
     s = s.lstrip("/")
-    if not s:
-        return None
-    if re.match(r"^[A-Za-z]:", s):
+    if not s or "://" in s:
         return None
-    if "://" in s or s.startswith("//"):
+    if len(s) > 1 and s[1] == ":" and s[0].isascii() and s[0].isalpha():
         return None
-    parts = [p for p in s.split("/") if p not in ("", ".")]
-    if not parts or any(p == ".." for p in parts):
+    parts: List[str] = []
+    for p in s.split("/"):
+        if p == "..":
+            return None
+        if p and p != ".":
+            parts.append(p)
+    if not parts:
         return None
     if allowed_prefixes:
-        if parts[0] not in set(allowed_prefixes):
+        if parts[0] not in allowed_prefixes:
             return None
     last = parts[-1]
-    m = re.search(r"\.([A-Za-z0-9]{2,5})$", last)
-    if not m:
-        return None
-    ext = m.group(1).lower()
-    if ext not in _LOCAL_ASSET_EXTS:
+    dot = last.rfind(".")
+    if dot < 0 or last[dot + 1 :].lower() not in _LOCAL_ASSET_EXTS:
         return None
     return "/" + "/".join(parts)
 
 
-def _student_key(student_id: int) -> str:
-    return str(int(student_id))
+# Most recent reranked queries kept per index for semantic reuse; bounds memory and the per-query scan.
+_MAX_SEEN_QUERIES = 64
 
 
 @dataclass
@@ -290,40 +311,53 @@ class _IndexItem:
     items: List[CandidateItem]
     docs: List[str]
     index: EmbeddingIndex
+    # (query vector, result) of queries already reranked against this index, for semantic reuse.
+    seen: Deque[Tuple[List[float], Tuple[CandidateItem, float]]] = field(
+        default_factory=lambda: deque(maxlen=_MAX_SEEN_QUERIES)
+    )
 
 
 class _IndexCache:
     def __init__(self, max_items: int = 8):
         self.max_items = max(1, int(max_items))
-        self._order: List[str] = []
-        self._data: Dict[str, _IndexItem] = {}
+        # LRU order: least recently used first.
+        self._data: "OrderedDict[str, _IndexItem]" = OrderedDict()
+        # In-flight builds: concurrent misses on one key share a single embedding request.
+        self._building: Dict[str, "asyncio.Future[_IndexItem]"] = {}
 
     def get(self, key: str) -> Optional[_IndexItem]:
         it = self._data.get(key)
         if it is None:
             return None
-        # refresh LRU
-        try:
-            self._order.remove(key)
-        except ValueError:
-            pass
-        self._order.append(key)
+        self._data.move_to_end(key)
         return it
 
     def put(self, key: str, item: _IndexItem) -> None:
-        if key in self._data:
-            self._data[key] = item
-            try:
-                self._order.remove(key)
-            except ValueError:
-                pass
-            self._order.append(key)
-            return
         self._data[key] = item
-        self._order.append(key)
-        while len(self._order) > self.max_items:
-            evict = self._order.pop(0)
-            self._data.pop(evict, None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    async def get_or_build(self, key: str, build: Callable[[], Awaitable[_IndexItem]]) -> _IndexItem:
+        it = self.get(key)
+        if it is not None:
+            return it
+        fut = self._building.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(build())
+            self._building[key] = fut
+            fut.add_done_callback(lambda _f: self._building.pop(key, None))
+        it = await fut
+        self.put(key, it)
+        return it
+
+
+async def _limited(limiter: Optional[asyncio.Semaphore], aw: Awaitable[Any]) -> Any:
+    # Only provider round trips take a slot; local tag loading and vector math run unthrottled.
+    if limiter is None:
+        return await aw
+    async with limiter:
+        return await aw
 
 
 async def resolve_one(
@@ -336,26 +370,46 @@ async def resolve_one(
     embedder: Optional[SiliconFlowEmbedder] = None,
     embed_top_k: int = 50,
     index_cache: Optional[_IndexCache] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+    image_exists: Callable[[Path], bool] = Path.exists,
+    semantic_threshold: float = 0.0,
+    query_vec: Optional[List[float]] = None,
 ) -> Tuple[CandidateItem, float]:
     if not items:
         raise RuntimeError("missing tags for target")
 
-    docs_all = [_doc_text(it.doc) for it in items]
     chosen_items = items
-    chosen_docs = docs_all
+    # Only built when reranking over all candidates; a cached index already holds its doc texts.
+    chosen_docs: Optional[List[str]] = None
     chosen_map: Optional[List[int]] = None
+    cached: Optional[_IndexItem] = None
+    q_vec: Optional[List[float]] = None
 
     if embedder is not None and int(embed_top_k) > 0 and len(items) > int(embed_top_k):
         try:
             cache = index_cache or _IndexCache(max_items=8)
-            cached = cache.get(cache_key)
-            if cached is None:
-                vecs = await embedder.embed_texts(docs_all, use_cache=True)
-                idx = EmbeddingIndex.build(vecs)
-                cached = _IndexItem(items=items, docs=docs_all, index=idx)
+
+            async def build() -> _IndexItem:
+                docs_all = [it.doc.text for it in items]
+                vecs = await _limited(limiter, embedder.embed_texts(docs_all, use_cache=True))
+                return _IndexItem(items=items, docs=docs_all, index=EmbeddingIndex.build(vecs))
+
+            cached = await cache.get_or_build(cache_key, build)
+            if cached.items is not items and cached.items != items:
+                # A cache shared across runs can outlive a tags/pack edit: rebuild rather than map
+                # top-k positions onto a stale candidate list.
+                cached = await build()
                 cache.put(cache_key, cached)
             # Cache query embeddings too (small: ~16KB for 4096-dim float32), to reduce repeated requests.
-            q_vec = (await embedder.embed_texts([query], use_cache=True))[0]
+            if query_vec is not None:
+                q_vec = query_vec
+            else:
+                q_vec = (await _limited(limiter, embedder.embed_texts([query], use_cache=True)))[0]
+            if semantic_threshold > 0:
+                # Near-duplicate of a query already reranked on this character: reuse its pick.
+                for seen_vec, seen_result in cached.seen:
+                    if cosine_similarity(q_vec, seen_vec) >= semantic_threshold:
+                        return seen_result
             top_idx = cached.index.top_k(q_vec, int(embed_top_k))
             if top_idx:
                 chosen_map = top_idx
@@ -364,21 +418,30 @@ async def resolve_one(
         except Exception:
             # Embedding is an optimization; if it fails, fall back to rerank-only.
             chosen_items = items
-            chosen_docs = docs_all
+            chosen_docs = None
             chosen_map = None
+            cached = None
 
-    results = await reranker.rerank(query=query, documents=chosen_docs, top_n=top_n, return_documents=False)
+    if chosen_docs is None:
+        chosen_docs = [it.doc.text for it in items]
+    results = await _limited(
+        limiter, reranker.rerank(query=query, documents=chosen_docs, top_n=top_n, return_documents=False)
+    )
+    # Rows are normalized by the reranker client: {"index": int, "score": float}, best first.
     best = results[0]
-    idx = best.get("index")
-    score = float(best.get("score") or 0.0)
-    if not isinstance(idx, int) or not (0 <= idx < len(chosen_items)):
+    idx = best["index"]
+    score = best["score"]
+    if not (0 <= idx < len(chosen_items)):
         raise RuntimeError(f"invalid reranker result index: {idx}")
 
-    if chosen_map is not None:
-        idx = chosen_map[idx]
-    picked = items[idx]
-    if not picked.image_path.exists():
+    if chosen_map is not None and cached is not None:
+        picked = cached.items[chosen_map[idx]]
+    else:
+        picked = items[idx]
+    if not image_exists(picked.image_path):
         raise RuntimeError(f"resolved image missing on disk: {picked.image_path}")
+    if semantic_threshold > 0 and cached is not None and q_vec is not None:
+        cached.seen.append((q_vec, (picked, score)))
     return picked, score
 
 
@@ -401,8 +464,11 @@ async def resolve_file(
     asset_max_mb: int = 10,
     allow_local_assets: bool = False,
     asset_local_prefixes: Optional[List[str]] = None,
+    semantic_threshold: float = 0.0,
+    index_cache: Optional[_IndexCache] = None,
 ) -> int:
-    data = json.loads(input_path.read_text(encoding="utf-8"))
+    # Large chat JSON: read and parse in a worker thread so a host event loop stays responsive.
+    data = await asyncio.to_thread(lambda: _json_loads(input_path.read_bytes()))
     chat = data.get("chat")
     if not isinstance(chat, list):
         raise SystemExit("input JSON missing 'chat' list")
@@ -410,7 +476,43 @@ async def resolve_file(
     cfg = SiliconFlowRerankConfig(api_key_env=api_key_env, model=model)
     embed_cfg = SiliconFlowEmbedConfig(api_key_env=api_key_env, model=embed_model)
     sem = asyncio.Semaphore(max(1, concurrency))
-    idx_cache = _IndexCache(max_items=8)
+    # Callers resolving several files can pass one cache to reuse embedding indexes across runs
+    # (an index is rebuilt when its candidates changed); only share it between runs with the same embedding model.
+    idx_cache = index_cache if index_cache is not None else _IndexCache(max_items=8)
+    # Query embeddings fetched up front in one batch (see prefetch_query_vecs).
+    query_vecs: Dict[str, List[float]] = {}
+    # (cache_key, query, with_embedding) -> resolve_one task: repeated expressions are resolved once per run.
+    resolved: Dict[Tuple[str, str, bool], "asyncio.Future[Tuple[CandidateItem, float]]"] = {}
+
+    def resolve_cached(
+        reranker: SiliconFlowReranker,
+        embedder: Optional[SiliconFlowEmbedder],
+        *,
+        query: str,
+        items: List[CandidateItem],
+        cache_key: str,
+    ) -> "asyncio.Future[Tuple[CandidateItem, float]]":
+        key = (cache_key, query, embedder is not None)
+        fut = resolved.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(
+                resolve_one(
+                    reranker,
+                    query=query,
+                    items=items,
+                    cache_key=cache_key,
+                    top_n=1,
+                    embedder=embedder,
+                    embed_top_k=int(embed_top_k),
+                    index_cache=idx_cache,
+                    limiter=sem,
+                    image_exists=image_exists,
+                    semantic_threshold=float(semantic_threshold),
+                    query_vec=query_vecs.get(query) if embedder is not None else None,
+                )
+            )
+            resolved[key] = fut
+        return fut
 
     pack_ba: Optional["PackV2"] = None
     if load_pack_v2 is not None:
@@ -453,6 +555,71 @@ async def resolve_file(
                 continue
             active_packs[alias] = pack
 
+    # Image dir listings for this run: one listdir per directory instead of a stat per resolved image.
+    dir_listing: Dict[Path, frozenset[str]] = {}
+
+    def _list_dir(d: Path) -> frozenset[str]:
+        names = dir_listing.get(d)
+        if names is None:
+            try:
+                names = frozenset(os.listdir(d))
+            except OSError:
+                names = frozenset()
+            dir_listing[d] = names
+        return names
+
+    def image_exists(p: Path) -> bool:
+        # Listing hits skip the stat; a miss still gets a real exists() check, since the listing
+        # comparison is case-sensitive while Windows/macOS filesystems usually are not.
+        return p.name in _list_dir(p.parent) or p.exists()
+
+    def _kivo_candidates(student_id: int) -> List[CandidateItem]:
+        docs = _load_tags_for_student(tags_root, student_id)
+        if not docs:
+            raise RuntimeError(f"missing tags for student {student_id}")
+        images_dir = (tags_root / str(student_id)).resolve()
+        _list_dir(images_dir)
+        return [CandidateItem(doc=d, image_path=(images_dir / d.image_name)) for d in docs]
+
+    def _items_for_pack(pack: "PackV2", *, cid: str) -> List[CandidateItem]:
+        if cid not in pack.id_to_assets:
+            return []
+        docs = _load_tags_for_pack_char(pack, cid)
+        if not docs:
+            return []
+        images_dir = pack.tags_path(cid).parent.resolve()
+        _list_dir(images_dir)
+        return [CandidateItem(doc=d, image_path=(images_dir / d.image_name)) for d in docs]
+
+    def _ba_candidates(cid: str) -> Tuple[List[CandidateItem], Dict[str, List[CandidateItem]]]:
+        merged_items: List[CandidateItem] = []
+        pack_items_by_alias: Dict[str, List[CandidateItem]] = {}
+        base_items = _items_for_pack(pack_ba, cid=cid)
+        if base_items:
+            pack_items_by_alias["ba"] = base_items
+            merged_items.extend(base_items)
+        for alias, pack in active_packs.items():
+            pit = _items_for_pack(pack, cid=cid)
+            if pit:
+                pack_items_by_alias[alias] = pit
+                merged_items.extend(pit)
+        if not merged_items:
+            raise RuntimeError(f"missing tags for ba.{cid}")
+        return merged_items, pack_items_by_alias
+
+    # Candidate lists per student id / ba char id for this run: every expression on the same
+    # character reuses one list, so its embedding index is built once. Tag files are read on
+    # worker threads so the event loop keeps serving provider calls meanwhile.
+    kivo_items: Dict[int, "asyncio.Future[List[CandidateItem]]"] = {}
+    ba_items: Dict[str, "asyncio.Future[Tuple[List[CandidateItem], Dict[str, List[CandidateItem]]]]"] = {}
+
+    def load_candidates(memo: Dict[Any, "asyncio.Future[Any]"], key: Any, load: Callable[[Any], Any]) -> "asyncio.Future[Any]":
+        fut = memo.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(asyncio.to_thread(load, key))
+            memo[key] = fut
+        return fut
+
     meta = data.get("meta") if isinstance(data, dict) else None
     meta = meta if isinstance(meta, dict) else {}
 
@@ -480,13 +647,58 @@ async def resolve_file(
         except Exception:
             asset_ref_base = asset_cache_dir
 
+    # Ref prefixes are fixed for the run; segments only append file names.
+    ref_base_s = ref_base.as_posix()
+    asset_ref_base_s = asset_ref_base.as_posix()
+    ref_root_abs = Path(ref_root).resolve() if ref_root is not None else None
+    # Per-student strings, formatted once per run: (index/dedupe cache key, image ref prefix).
+    student_strs: Dict[int, Tuple[str, str]] = {}
+
+    def _student_strs(student_id: int) -> Tuple[str, str]:
+        strs = student_strs.get(student_id)
+        if strs is None:
+            sid_s = str(student_id)
+            strs = student_strs[student_id] = (f"kivo:{sid_s}", f"{ref_base_s}/{sid_s}/")
+        return strs
+
     max_bytes = max(1, int(asset_max_mb)) * 1024 * 1024
     local_prefixes = asset_local_prefixes or ["mmt_assets"]
 
     async with ExternalAssetDownloader(ExternalAssetConfig(cache_dir=asset_cache_dir, max_bytes=max_bytes)) as dl:
+        # In-flight downloads by URL: concurrent fetches of one URL share a single request.
+        inflight: Dict[str, "asyncio.Future[Path]"] = {}
+
+        def fetch_once(url: str) -> "asyncio.Future[Path]":
+            fut = inflight.get(url)
+            if fut is None:
+                fut = asyncio.ensure_future(_limited(sem, dl.fetch(url, force=bool(redownload_assets))))
+                inflight[url] = fut
+
+                def _done(f: "asyncio.Future[Path]") -> None:
+                    inflight.pop(url, None)
+                    # A download started ahead of use is abandoned when strict mode stops a line early;
+                    # its error is reported by whoever awaits it, so don't let asyncio log it as unretrieved.
+                    if not f.cancelled():
+                        f.exception()
+
+                fut.add_done_callback(_done)
+            return fut
+
         # Resolve @asset.* in meta to local cached files so Typst can read them.
         assets = _assets_from_meta(meta)
         if assets:
+            # External URLs are downloaded concurrently up front; results are applied below in meta order.
+            url_names: List[str] = []
+            for name, url in assets.items():
+                raw = (url or "").strip()
+                if not raw.lower().startswith("cache:") and not raw.startswith("data:image/") and is_url_like(raw):
+                    url_names.append(name)
+            fetched = dict(
+                zip(
+                    url_names,
+                    await asyncio.gather(*(fetch_once(assets[name].strip()) for name in url_names), return_exceptions=True),
+                )
+            )
             for name, url in list(assets.items()):
                 raw = (url or "").strip()
                 # Trusted local cache reference injected by the bot/plugin:
@@ -507,7 +719,7 @@ async def resolve_file(
                         meta.pop(f"asset.{name}", None)
                         meta[f"asset_error.{name}"] = f"missing cached file: {fn}"
                         continue
-                    meta[f"asset.{name}"] = f"{asset_ref_base.as_posix()}/{fn}"
+                    meta[f"asset.{name}"] = f"{asset_ref_base_s}/{fn}"
                     continue
                 # Security: do not allow arbitrary local paths via @asset.* (Typst would be able to read them
                 # as long as they are under --root). Only allow external URLs (downloaded to cache) or data URLs.
@@ -530,8 +742,10 @@ async def resolve_file(
                     )
                     continue
                 try:
-                    p = await dl.fetch(raw, force=bool(redownload_assets))
-                    meta[f"asset.{name}"] = f"{asset_ref_base.as_posix()}/{p.name}"
+                    p = fetched[name]
+                    if isinstance(p, BaseException):
+                        raise p
+                    meta[f"asset.{name}"] = f"{asset_ref_base_s}/{p.name}"
                 except Exception as exc:
                     if strict:
                         raise
@@ -539,11 +753,13 @@ async def resolve_file(
                     meta[f"asset_error.{name}"] = str(exc)
 
         data["meta"] = meta
-        data["typst_assets_global"] = _build_typst_assets_global(meta)
-        _apply_avatar_overrides(data, meta)
+        # Resolved asset refs by name; `meta` keeps the asset.* keys for the output only.
+        asset_map = _assets_from_meta(meta)
+        data["typst_assets_global"] = _build_typst_assets_global(asset_map)
+        _apply_avatar_overrides(data, asset_map)
         for line in chat:
             if isinstance(line, dict):
-                _rewrite_line_avatar_override(line, meta)
+                _rewrite_line_avatar_override(line, asset_map)
 
         async def resolve_line(
             reranker: SiliconFlowReranker,
@@ -553,6 +769,13 @@ async def resolve_file(
             async def resolve_segments_list(
                 segments: List[Any],
             ) -> tuple[List[Dict[str, Any]], Optional[Exception]]:
+                # Start every download in this list together; the loop below awaits them in segment order.
+                downloads: Dict[str, "asyncio.Future[Path]"] = {}
+                for seg in segments:
+                    url = _segment_download_url(seg, asset_map)
+                    if url is not None and url not in downloads:
+                        downloads[url] = fetch_once(url)
+
                 new_segments: List[Dict[str, Any]] = []
                 for seg in segments:
                     if not isinstance(seg, dict):
@@ -560,13 +783,11 @@ async def resolve_file(
                     seg_type = seg.get("type")
                     if seg_type == "asset":
                         name = str(seg.get("name") or "").strip()
-                        v = _asset_value(meta, name)
+                        v = asset_map.get(name)
                         if not v:
                             if strict:
                                 return new_segments, RuntimeError(f"missing @asset.{name}")
-                            seg2 = dict(seg)
-                            seg2["error"] = f"missing @asset.{name}"
-                            new_segments.append(seg2)
+                            new_segments.append({**seg, "error": f"missing @asset.{name}"})
                             continue
 
                         # v is already policy-filtered by the meta rewrite step above.
@@ -576,12 +797,11 @@ async def resolve_file(
 
                         if is_url_like(v):
                             try:
-                                async with sem:
-                                    p = await dl.fetch(v, force=bool(redownload_assets))
+                                p = await downloads[v]
                                 new_segments.append(
                                     {
                                         "type": "image",
-                                        "ref": f"{asset_ref_base.as_posix()}/{p.name}",
+                                        "ref": f"{asset_ref_base_s}/{p.name}",
                                         "alt": f"asset:{name}",
                                     }
                                 )
@@ -589,9 +809,7 @@ async def resolve_file(
                             except Exception as exc:
                                 if strict:
                                     return new_segments, exc
-                                seg2 = dict(seg)
-                                seg2["error"] = str(exc)
-                                new_segments.append(seg2)
+                                new_segments.append({**seg, "error": str(exc)})
                                 continue
 
                         new_segments.append({"type": "image", "ref": v, "alt": f"asset:{name}"})
@@ -599,26 +817,16 @@ async def resolve_file(
                     # External image URLs might already be parsed as `type=image` by the DSL parser.
                     if seg_type == "image":
                         ref = str(seg.get("ref") or "").strip()
-                        if not ref:
-                            new_segments.append(seg)
-                            continue
-                        if ref.startswith("data:image/"):
-                            new_segments.append(seg)
-                            continue
-                        if is_url_like(ref):
+                        # Only external URLs are rewritten; everything else passes through as-is.
+                        if ref and not ref.startswith("data:image/") and is_url_like(ref):
                             try:
-                                async with sem:
-                                    p = await dl.fetch(ref, force=bool(redownload_assets))
-                                seg2 = dict(seg)
-                                seg2["ref"] = f"{asset_ref_base.as_posix()}/{p.name}"
-                                new_segments.append(seg2)
+                                p = await downloads[ref]
+                                new_segments.append({**seg, "ref": f"{asset_ref_base_s}/{p.name}"})
                                 continue
                             except Exception as exc:
                                 if strict:
                                     return new_segments, exc
-                                seg2 = dict(seg)
-                                seg2["error"] = str(exc)
-                                new_segments.append(seg2)
+                                new_segments.append({**seg, "error": str(exc)})
                                 continue
                         new_segments.append(seg)
                         continue
@@ -639,12 +847,11 @@ async def resolve_file(
                         continue
                     if is_url_like(query):
                         try:
-                            async with sem:
-                                p = await dl.fetch(query, force=bool(redownload_assets))
+                            p = await downloads[query]
                             new_segments.append(
                                 {
                                     "type": "image",
-                                    "ref": f"{asset_ref_base.as_posix()}/{p.name}",
+                                    "ref": f"{asset_ref_base_s}/{p.name}",
                                     "alt": query,
                                 }
                             )
@@ -652,137 +859,91 @@ async def resolve_file(
                         except Exception as exc:
                             if strict:
                                 return new_segments, exc
-                            seg2 = dict(seg)
-                            seg2["error"] = str(exc)
-                            new_segments.append(seg2)
+                            new_segments.append({**seg, "error": str(exc)})
                             continue
 
                     # Direct by-index reference:
                     # - [:#5] / [#5]                  => merged/default index
                     # - [:#ex:12] / [#ex:12]          => index within pack alias "ex"
                     # - [:#ex.12] / [#ex.12]          => same as above (dot separator for convenience)
-                    m_idx = re.match(r"^#\s*(?:(?P<alias>[A-Za-z0-9_]+)\s*[:.]\s*)?(?P<n>\d+)\s*$", query)
+                    m_idx = _DIRECT_INDEX_RE.match(query)
                     direct_idx = int(m_idx.group("n")) if m_idx else None
                     direct_alias = (m_idx.group("alias") or "").strip() if m_idx else ""
                     direct_alias = direct_alias or ""
 
                     try:
-                        async with sem:
-                            if isinstance(student_id, int):
-                                docs = _load_tags_for_student(tags_root, student_id)
-                                if not docs:
-                                    raise RuntimeError(f"missing tags for student {student_id}")
-                                images_dir = (tags_root / str(student_id)).resolve()
-                                items = [CandidateItem(doc=d, image_path=(images_dir / d.image_name)) for d in docs]
-
-                                if direct_idx is not None:
-                                    i0 = direct_idx - 1
-                                    if i0 < 0 or i0 >= len(items):
-                                        raise RuntimeError(f"index out of range: #{direct_idx} (1..{len(items)})")
-                                    picked = items[i0]
-                                    if not picked.image_path.exists():
-                                        raise RuntimeError(f"resolved image missing on disk: {picked.image_path}")
-                                    score = 1.0
-                                else:
-                                    picked, score = await resolve_one(
-                                        reranker,
-                                        query=query,
-                                        items=items,
-                                        cache_key=f"kivo:{student_id}",
-                                        top_n=1,
-                                        embedder=embedder,
-                                        embed_top_k=int(embed_top_k),
-                                        index_cache=idx_cache,
-                                    )
-                                image_name = picked.doc.image_name
+                        if isinstance(student_id, int):
+                            items = await load_candidates(kivo_items, student_id, _kivo_candidates)
+                            student_cache_key, student_ref_prefix = _student_strs(student_id)
+
+                            if direct_idx is not None:
+                                i0 = direct_idx - 1
+                                if i0 < 0 or i0 >= len(items):
+                                    raise RuntimeError(f"index out of range: #{direct_idx} (1..{len(items)})")
+                                picked = items[i0]
+                                if not image_exists(picked.image_path):
+                                    raise RuntimeError(f"resolved image missing on disk: {picked.image_path}")
+                                score = 1.0
+                            else:
+                                picked, score = await resolve_cached(
+                                    reranker, embedder, query=query, items=items, cache_key=student_cache_key
+                                )
 
-                                new_segments.append(
-                                    {
-                                        "type": "image",
-                                        "ref": f"{ref_base.as_posix()}/{student_id}/{image_name}",
-                                        "alt": query,
-                                        "score": score,
-                                    }
+                            new_segments.append(
+                                {
+                                    "type": "image",
+                                    "ref": student_ref_prefix + picked.doc.image_name,
+                                    "alt": query,
+                                    "score": score,
+                                }
+                            )
+                        elif isinstance(target_char_id, str) and target_char_id.startswith("ba.") and pack_ba is not None:
+                            cid = target_char_id.split(".", 1)[1]
+                            merged_items, pack_items_by_alias = await load_candidates(ba_items, cid, _ba_candidates)
+
+                            selected_items = merged_items
+                            if direct_idx is not None and direct_alias:
+                                if direct_alias not in pack_items_by_alias:
+                                    raise RuntimeError(f"unknown pack alias in index: {direct_alias}")
+                                selected_items = pack_items_by_alias[direct_alias]
+
+                            if direct_idx is not None:
+                                i0 = direct_idx - 1
+                                if i0 < 0 or i0 >= len(selected_items):
+                                    raise RuntimeError(f"index out of range: #{direct_idx} (1..{len(selected_items)})")
+                                picked = selected_items[i0]
+                                if not image_exists(picked.image_path):
+                                    raise RuntimeError(f"resolved image missing on disk: {picked.image_path}")
+                                score = 1.0
+                            else:
+                                # Cache must include the exact merged order to avoid mixing indices across different merge orders.
+                                merged_order: List[str] = []
+                                if "ba" in pack_items_by_alias:
+                                    merged_order.append("ba")
+                                for a in active_packs.keys():
+                                    if a in pack_items_by_alias:
+                                        merged_order.append(a)
+                                cache_key = f"ba:{cid}|packs:" + ",".join(merged_order)
+                                picked, score = await resolve_cached(
+                                    reranker, embedder, query=query, items=selected_items, cache_key=cache_key
                                 )
-                            elif isinstance(target_char_id, str) and target_char_id.startswith("ba.") and pack_ba is not None:
-                                cid = target_char_id.split(".", 1)[1]
-
-                                def _items_for_pack(pack: "PackV2", *, cid: str) -> List[CandidateItem]:
-                                    if cid not in pack.id_to_assets:
-                                        return []
-                                    docs = _load_tags_for_pack_char(pack, cid)
-                                    if not docs:
-                                        return []
-                                    images_dir = pack.tags_path(cid).parent.resolve()
-                                    return [CandidateItem(doc=d, image_path=(images_dir / d.image_name)) for d in docs]
-
-                                merged_items: List[CandidateItem] = []
-                                pack_items_by_alias: Dict[str, List[CandidateItem]] = {}
-                                base_items = _items_for_pack(pack_ba, cid=cid)
-                                if base_items:
-                                    pack_items_by_alias["ba"] = base_items
-                                    merged_items.extend(base_items)
-                                for alias, pack in active_packs.items():
-                                    pit = _items_for_pack(pack, cid=cid)
-                                    if pit:
-                                        pack_items_by_alias[alias] = pit
-                                        merged_items.extend(pit)
-
-                                if not merged_items:
-                                    raise RuntimeError(f"missing tags for ba.{cid}")
-
-                                selected_items = merged_items
-                                if direct_idx is not None and direct_alias:
-                                    if direct_alias not in pack_items_by_alias:
-                                        raise RuntimeError(f"unknown pack alias in index: {direct_alias}")
-                                    selected_items = pack_items_by_alias[direct_alias]
-
-                                if direct_idx is not None:
-                                    i0 = direct_idx - 1
-                                    if i0 < 0 or i0 >= len(selected_items):
-                                        raise RuntimeError(f"index out of range: #{direct_idx} (1..{len(selected_items)})")
-                                    picked = selected_items[i0]
-                                    if not picked.image_path.exists():
-                                        raise RuntimeError(f"resolved image missing on disk: {picked.image_path}")
-                                    score = 1.0
-                                else:
-                                    # Cache must include the exact merged order to avoid mixing indices across different merge orders.
-                                    merged_order: List[str] = []
-                                    if "ba" in pack_items_by_alias:
-                                        merged_order.append("ba")
-                                    for a in active_packs.keys():
-                                        if a in pack_items_by_alias:
-                                            merged_order.append(a)
-                                    cache_key = f"ba:{cid}|packs:" + ",".join(merged_order)
-                                    picked, score = await resolve_one(
-                                        reranker,
-                                        query=query,
-                                        items=selected_items,
-                                        cache_key=cache_key,
-                                        top_n=1,
-                                        embedder=embedder,
-                                        embed_top_k=int(embed_top_k),
-                                        index_cache=idx_cache,
-                                    )
-
-                                img_abs = picked.image_path.resolve()
-                                if ref_root is not None:
-                                    try:
-                                        ref = Path(os.path.relpath(img_abs, start=Path(ref_root).resolve())).as_posix()
-                                    except Exception:
-                                        ref = img_abs.as_posix()
-                                else:
+
+                            img_abs = picked.image_path.resolve()
+                            if ref_root_abs is not None:
+                                try:
+                                    ref = Path(os.path.relpath(img_abs, start=ref_root_abs)).as_posix()
+                                except Exception:
                                     ref = img_abs.as_posix()
-                                new_segments.append({"type": "image", "ref": ref, "alt": query, "score": score})
                             else:
-                                new_segments.append(seg)
-                                continue
+                                ref = img_abs.as_posix()
+                            new_segments.append({"type": "image", "ref": ref, "alt": query, "score": score})
+                        else:
+                            new_segments.append(seg)
+                            continue
                     except Exception as exc:
                         if strict:
                             return new_segments, exc
-                        seg2 = dict(seg)
-                        seg2["error"] = str(exc)
-                        new_segments.append(seg2)
+                        new_segments.append({**seg, "error": str(exc)})
                 return new_segments, None
 
             segments = line.get("segments")
@@ -806,39 +967,100 @@ async def resolve_file(
                     item["segments"] = new_segments
             return None
 
+        async def prefetch_query_vecs(embedder: SiliconFlowEmbedder) -> None:
+            # One batched embedding request for the expression queries that will go through semantic search
+            # (characters with more than embed_top_k candidates) instead of one request per query.
+            if int(embed_top_k) <= 0:
+                return
+            targets: Dict[Tuple[str, Any], Dict[str, None]] = {}
+            for line in chat:
+                if not isinstance(line, dict):
+                    continue
+                seg_lists = [line.get("segments")]
+                line_items = line.get("items")
+                if isinstance(line_items, list):
+                    seg_lists.extend(it.get("segments") for it in line_items if isinstance(it, dict))
+                for segs in seg_lists:
+                    if not isinstance(segs, list):
+                        continue
+                    for seg in segs:
+                        if not isinstance(seg, dict) or seg.get("type") != "expr":
+                            continue
+                        q = str(seg.get("query") or "").strip()
+                        if not q or q.startswith("data:image/") or is_url_like(q) or _DIRECT_INDEX_RE.match(q):
+                            continue
+                        student_id = seg.get("student_id")
+                        target_char_id = seg.get("target_char_id") or seg.get("char_id") or line.get("char_id")
+                        if isinstance(student_id, int):
+                            target: Tuple[str, Any] = ("kivo", student_id)
+                        elif isinstance(target_char_id, str) and target_char_id.startswith("ba.") and pack_ba is not None:
+                            target = ("ba", target_char_id.split(".", 1)[1])
+                        else:
+                            continue
+                        targets.setdefault(target, {})[q] = None
+            if not targets:
+                return
+
+            # Load each target's candidates first (shared with resolve_line) to see which ones get an index.
+            loaded = await asyncio.gather(
+                *(
+                    load_candidates(kivo_items, key, _kivo_candidates)
+                    if kind == "kivo"
+                    else load_candidates(ba_items, key, _ba_candidates)
+                    for kind, key in targets
+                ),
+                return_exceptions=True,
+            )
+            queries: Dict[str, None] = {}
+            for (kind, _key), qs, res in zip(targets, targets.values(), loaded):
+                if isinstance(res, BaseException):
+                    # resolve_line reports the load error for these expressions.
+                    continue
+                items = res if kind == "kivo" else res[0]
+                if len(items) > int(embed_top_k):
+                    queries.update(qs)
+            if not queries:
+                return
+            try:
+                vecs = await _limited(sem, embedder.embed_texts(list(queries), use_cache=True))
+            except Exception as exc:
+                logger.warning(f"query embedding prefetch failed, embedding per query instead | queries={len(queries)} error={exc}")
+                return
+            query_vecs.update(zip(queries, vecs))
+
+        async def resolve_lines(
+            reranker: SiliconFlowReranker,
+            embedder: Optional[SiliconFlowEmbedder],
+        ) -> None:
+            # A fixed pool of workers pulls lines in order, so long chats never hold one task per line.
+            lines = [line for line in chat if isinstance(line, dict)]
+            results: List[Optional[Exception]] = [None] * len(lines)
+            pending = iter(enumerate(lines))
+
+            async def worker() -> None:
+                for i, line in pending:
+                    results[i] = await resolve_line(reranker, embedder, line)
+
+            await asyncio.gather(*(worker() for _ in range(min(max(1, concurrency), len(lines)))))
+            # Report the first failing line in document order, whichever worker finished first.
+            for r in results:
+                if isinstance(r, Exception):
+                    raise r
+
         async with SiliconFlowReranker(cfg) as reranker:
             if use_embedding:
                 try:
                     async with SiliconFlowEmbedder(embed_cfg) as embedder:
-                        tasks = []
-                        for line in chat:
-                            if isinstance(line, dict):
-                                tasks.append(asyncio.create_task(resolve_line(reranker, embedder, line)))
-                        results = await asyncio.gather(*tasks, return_exceptions=False)
-                        for r in results:
-                            if isinstance(r, Exception):
-                                raise r
+                        await prefetch_query_vecs(embedder)
+                        await resolve_lines(reranker, embedder)
                 except Exception:
                     # Fallback: rerank-only if embedding fails (e.g. no key / endpoint issues).
-                    tasks = []
-                    for line in chat:
-                        if isinstance(line, dict):
-                            tasks.append(asyncio.create_task(resolve_line(reranker, None, line)))
-                    results = await asyncio.gather(*tasks, return_exceptions=False)
-                    for r in results:
-                        if isinstance(r, Exception):
-                            raise r
+                    await resolve_lines(reranker, None)
             else:
-                tasks = []
-                for line in chat:
-                    if isinstance(line, dict):
-                        tasks.append(asyncio.create_task(resolve_line(reranker, None, line)))
-                results = await asyncio.gather(*tasks, return_exceptions=False)
-                for r in results:
-                    if isinstance(r, Exception):
-                        raise r
-
-    output_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+                await resolve_lines(reranker, None)
+
+    # Same bytes as json.dumps(data, ensure_ascii=False, indent=2), written one chat line at a time.
+    await asyncio.to_thread(_write_json_streaming, output_path, data)
     return 0
 
 
@@ -853,6 +1075,13 @@ def main() -> int:
     p.add_argument("--embed-model", default="Qwen/Qwen3-Embedding-8B", help="Embedding model for first-stage recall.")
     p.add_argument("--embed-top-k", type=int, default=50, help="Recall top-k docs before rerank (default: 50).")
     p.add_argument("--no-embedding", action="store_true", help="Disable embedding recall; rerank over all candidates.")
+    p.add_argument(
+        "--semantic-threshold",
+        type=float,
+        default=0.0,
+        help="Reuse an earlier pick when a query's embedding has cosine similarity >= this with a previous query "
+        "on the same character, skipping the rerank (default: 0 = off; e.g. 0.92).",
+    )
     p.add_argument(
         "--asset-cache-dir",
         default=None,
@@ -895,6 +1124,7 @@ def main() -> int:
             use_embedding=not bool(args.no_embedding),
             embed_model=str(args.embed_model),
             embed_top_k=int(args.embed_top_k),
+            semantic_threshold=float(args.semantic_threshold),
             asset_cache_dir=Path(args.asset_cache_dir) if args.asset_cache_dir else None,
             redownload_assets=bool(args.redownload_assets),
             asset_max_mb=int(args.asset_max_mb),
@@ -6,7 +6,7 @@ import logging
 import os
 import sys
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 _ROOT = Path(__file__).resolve().parents[1]
 if str(_ROOT) not in sys.path:
@@ -14,7 +14,6 @@ if str(_ROOT) not in sys.path:
 
 from mmt_core.pack_v2 import PackV2, load_pack_v2  # noqa: E402
 from mmt_core.resolve_expressions import (  # noqa: E402
-    _doc_text,
     _load_tags_for_pack_char,
     _load_tags_for_student,
 )
@@ -47,6 +46,16 @@ def _iter_pack_dirs(root: Path, pack_ids: Optional[List[str]]) -> Iterable[Path]
         yield d
 
 
+def _collect_docs(collected: Dict[str, None], char_docs: List[List[str]], docs: List[str], label: str) -> None:
+    # `collected` is an insertion-ordered set: docs shared across characters are kept (and sent) once.
+    # `char_docs` keeps each character's own list so the final count stays per character.
+    if not docs:
+        return
+    logger.info("collected %s | docs=%d", label, len(docs))
+    collected.update(dict.fromkeys(docs))
+    char_docs.append(docs)
+
+
 async def _embed_docs(
     *,
     embedder: SiliconFlowEmbedder,
@@ -87,7 +96,10 @@ async def _run(
     backoff: float,
     sleep_s: float,
 ) -> int:
-    total_docs = 0
+    # All tag docs are gathered first, deduplicated, then embedded in batch_size chunks; each chunk
+    # is retried on its own and skipped (with a warning) if it keeps failing.
+    collected: Dict[str, None] = {}
+    char_docs: List[List[str]] = []
     pack_v2_root = pack_v2_root.expanduser()
     if pack_v2_root.exists():
         logger.info("pack-v2 root: %s", pack_v2_root)
@@ -95,30 +107,30 @@ async def _run(
         logger.warning("pack-v2 root missing: %s", pack_v2_root)
 
     async with SiliconFlowEmbedder(config) as embedder:
+        # Pack and tag loading is blocking file IO; run it on worker threads so files are read concurrently.
         if pack_v2_root.exists():
-            for pack_dir in _iter_pack_dirs(pack_v2_root, pack_ids):
-                try:
-                    pack = load_pack_v2(pack_dir)
-                except Exception as exc:
-                    logger.warning("skip pack: %s (%s)", pack_dir.name, exc)
+            pack_dirs = list(_iter_pack_dirs(pack_v2_root, pack_ids))
+            loaded = await asyncio.gather(
+                *(asyncio.to_thread(load_pack_v2, d) for d in pack_dirs),
+                return_exceptions=True,
+            )
+            pack_chars: List[Tuple[PackV2, str]] = []
+            for pack_dir, pack in zip(pack_dirs, loaded):
+                if isinstance(pack, BaseException):
+                    logger.warning("skip pack: %s (%s)", pack_dir.name, pack)
                     continue
 
                 if pack.manifest.type not in ("base", "extension"):
                     logger.warning("skip pack with unknown type: %s", pack.manifest.pack_id)
                     continue
 
-                for cid in sorted(pack.id_to_assets.keys()):
-                    docs = _load_tags_for_pack_char(pack, cid)
-                    text_docs = [_doc_text(d) for d in docs]
-                    label = f"{pack.manifest.pack_id}:{cid}"
-                    total_docs += await _embed_docs(
-                        embedder=embedder,
-                        docs=text_docs,
-                        label=label,
-                        retries=retries,
-                        backoff=backoff,
-                        sleep_s=sleep_s,
-                    )
+                pack_chars.extend((pack, cid) for cid in pack.id_to_assets)
+
+            pack_docs = await asyncio.gather(
+                *(asyncio.to_thread(_load_tags_for_pack_char, pack, cid) for pack, cid in pack_chars)
+            )
+            for (pack, cid), docs in zip(pack_chars, pack_docs):
+                _collect_docs(collected, char_docs, [d.text for d in docs], f"{pack.manifest.pack_id}:{cid}")
 
         if include_legacy:
             tags_root = legacy_tags_root or Path("images/students")
@@ -126,24 +138,42 @@ async def _run(
             if not tags_root.exists():
                 logger.warning("legacy tags root missing: %s", tags_root)
             else:
+                sids: List[int] = []
                 for p in sorted(tags_root.glob("*/tags.json")):
                     try:
-                        sid = int(p.parent.name)
+                        sids.append(int(p.parent.name))
                     except Exception:
                         continue
-                    docs = _load_tags_for_student(tags_root, sid)
-                    text_docs = [_doc_text(d) for d in docs]
-                    label = f"legacy:{sid}"
-                    total_docs += await _embed_docs(
-                        embedder=embedder,
-                        docs=text_docs,
-                        label=label,
-                        retries=retries,
-                        backoff=backoff,
-                        sleep_s=sleep_s,
-                    )
-
-    return total_docs
+                legacy_docs = await asyncio.gather(
+                    *(asyncio.to_thread(_load_tags_for_student, tags_root, sid) for sid in sids)
+                )
+                for sid, docs in zip(sids, legacy_docs):
+                    _collect_docs(collected, char_docs, [d.text for d in docs], f"legacy:{sid}")
+
+        unique_docs = list(collected)
+        n_collected = sum(len(docs) for docs in char_docs)
+        if n_collected:
+            logger.info(
+                "dedup | docs=%d unique=%d (%.1f%% sent)", n_collected, len(unique_docs), 100.0 * len(unique_docs) / n_collected
+            )
+        batch_size = max(1, int(config.batch_size))
+        n_chunks = (len(unique_docs) + batch_size - 1) // batch_size
+        failed: set[str] = set()
+        for i in range(n_chunks):
+            chunk = unique_docs[i * batch_size : (i + 1) * batch_size]
+            done = await _embed_docs(
+                embedder=embedder,
+                docs=chunk,
+                label=f"chunk {i + 1}/{n_chunks}",
+                retries=retries,
+                backoff=backoff,
+                sleep_s=sleep_s,
+            )
+            if not done:
+                failed.update(chunk)
+
+    # Same meaning as before deduplication: docs of every character whose docs were all embedded.
+    return sum(len(docs) for docs in char_docs if failed.isdisjoint(docs))
 
 
 def main() -> int:
@@ -156,7 +186,7 @@ def main() -> int:
     p.add_argument("--api-key-env", default="SILICON_API_KEY")
     p.add_argument("--cache-path", default=os.getenv("MMT_EMBED_CACHE_PATH", "").strip())
     p.add_argument("--batch-size", type=int, default=64)
-    p.add_argument("--retries", type=int, default=3, help="Retry count per character on embed failure.")
+    p.add_argument("--retries", type=int, default=3, help="Retry count per batch on embed failure.")
     p.add_argument("--retry-backoff", type=float, default=1.0, help="Retry backoff seconds (linear).")
     p.add_argument("--sleep", type=float, default=0.0, help="Sleep seconds after each successful embed batch.")
     args = p.parse_args()